@@ -0,0 +1,98 @@
+import importlib
+import logging
+import os
+import traceback
+
+import diskcache
+from dash import DiskcacheManager
+
+from Services.simulation import cancel_simulations
+
+
+# BACKGROUND CALLBACKS
+# Slow callbacks run in a separate process and report back through a local
+# diskcache directory, so no broker or extra service is needed. The same cache
+# keeps the results and state jobs share across processes and restarts, each
+# under a fingerprint of what it was computed from.
+CACHE_DIR = os.getenv(
+    "BACKGROUND_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "background"),
+)
+CACHE_SIZE_LIMIT_MB = int(os.getenv("BACKGROUND_CACHE_SIZE_LIMIT_MB", "512"))
+RESULT_TTL_SECONDS = int(os.getenv("BACKGROUND_RESULT_TTL_SECONDS", "3600"))
+# Modules the job fork server imports once, so each job starts with the app and
+# its pages loaded instead of importing them again.
+JOB_PRELOAD = ["app"]
+
+logger = logging.getLogger(__name__)
+
+cache = diskcache.Cache(
+    CACHE_DIR,
+    size_limit=CACHE_SIZE_LIMIT_MB * 1024 * 1024,
+    eviction_policy="least-recently-used",
+)
+
+
+class JobManager(DiskcacheManager):
+    # Dash forks jobs straight from the web process, which also runs Flask and
+    # refresher threads, so a job could inherit a lock one of them held. Jobs
+    # fork from a fork server instead: a single-threaded process started once.
+    def call_job_fn(self, key, job_fn, args, context):
+        from multiprocess import get_context
+
+        # The fork server imported the app, so it registered the same callbacks
+        # under the same keys; only the key crosses over, not the function.
+        function_key = next(name for name, registered in self.func_registry.items() if registered is job_fn)
+        job_context = get_context("forkserver")
+        job_context.set_forkserver_preload(JOB_PRELOAD)
+        process = job_context.Process(
+            target=_run_job,
+            args=(function_key, key, self._make_progress_key(key), args, context),
+        )
+        process.start()
+        return process.pid
+
+    def terminate_job(self, job):
+        if job is not None:
+            try:
+                cancel_simulations(int(job))
+            except Exception:
+                logger.exception("Could not cancel the simulations of job %s", job)
+        super().terminate_job(job)
+
+
+def _run_job(function_key, result_key, *job_args):
+    job_fn = manager.func_registry.get(function_key)
+    if job_fn is None:
+        # multiprocess skips a preload that fails to import. Importing it here
+        # raises the real error, which is reported like a failed callback.
+        try:
+            for module in JOB_PRELOAD:
+                importlib.import_module(module)
+            job_fn = manager.func_registry.get(function_key)
+            if job_fn is None:
+                raise RuntimeError(
+                    f"The background callback is not registered after importing {', '.join(JOB_PRELOAD)}."
+                )
+        except Exception as exc:
+            cache.set(
+                result_key,
+                {"background_callback_error": {"msg": f"Background job could not start: {exc}",
+                                               "tb": traceback.format_exc()}},
+            )
+            raise
+    job_fn(result_key, *job_args)
+
+
+# Callback outputs are handed over once and dropped; what is worth keeping is
+# cached by the callbacks themselves under content fingerprints.
+manager = JobManager(cache, expire=RESULT_TTL_SECONDS)
+
+
+def cache_stats(name):
+    return {"hits": int(cache.get((name, "hits"), 0)), "misses": int(cache.get((name, "misses"), 0))}
+
+
+def count_lookup(name, hit):
+    # Counters live in the shared cache, so every process adds to the same totals.
+    cache.incr((name, "hits" if hit else "misses"))
@@ -0,0 +1,64 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+# IN-PROCESS LRU CACHE
+# Small thread-safe LRU with hit/miss counters for results that are expensive to
+# rebuild but fully determined by their inputs.
+class LRUCache:
+    def __init__(self, maxsize=32):
+        self.maxsize = max(int(maxsize), 1)
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return self._items[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._items),
+                "maxsize": self.maxsize,
+            }
+
+
+def fingerprint(*parts):
+    # Stable digest of arrays, frames and plain values for use as a cache key.
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        if hasattr(part, "to_numpy"):
+            labels = part.columns if hasattr(part, "columns") else part.index
+            digest.update(repr(list(labels)).encode())
+            part = part.to_numpy()
+        if isinstance(part, np.ndarray):
+            array = np.ascontiguousarray(part)
+            digest.update(str((array.dtype.str, array.shape)).encode())
+            digest.update(array.tobytes())
+        else:
+            digest.update(repr(part).encode())
+        digest.update(b"|")
+    return digest.hexdigest()
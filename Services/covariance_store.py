@@ -0,0 +1,164 @@
+import io
+import threading
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from Services.cache import fingerprint
+from Services.database import connect
+from Services.price_store import load_price_history, load_sync_state, sync_price_history
+from Services.risk_models import DEFAULT_WINDOW, EWMA_DECAY, OnlineCovariance
+
+
+# PERSISTED COVARIANCE STATE
+# One OnlineCovariance per ticker universe lives in portfolio.db. Each read only
+# folds in the daily bars stored since the last one, so a page visit costs
+# O(n^2) per new bar instead of a full pass over the lookback window.
+
+# History loaded when a universe is seen for the first time; enough for the
+# moving window and to warm up the EWMA.
+HISTORY_PERIOD = "1y"
+# States kept for ticker universes no longer on screen, most recently updated first.
+MAX_STATES = 8
+
+_lock = threading.Lock()
+_schema_ready = False
+
+
+def _ensure_schema(conn):
+    global _schema_ready
+    if _schema_ready:
+        return
+
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS covariance_state (
+            universe TEXT PRIMARY KEY,
+            tickers TEXT NOT NULL,
+            last_date TEXT NOT NULL,
+            state BLOB NOT NULL,
+            updated_at TIMESTAMP
+        )
+        """
+    )
+    _schema_ready = True
+
+
+def _coverage(tickers, sync_state):
+    # Each ticker's stored range and last history revision as string arrays
+    # ("" for never).
+    ranges = [sync_state.get(ticker, (None, None, None)) for ticker in tickers]
+    return tuple(np.array([value or "" for value in column]) for column in zip(*ranges))
+
+
+def _encode(estimator, last_prices, coverage):
+    buffer = io.BytesIO()
+    covered_from, covered_to, revised_at = coverage
+    np.savez(
+        buffer,
+        prices=last_prices,
+        covered_from=covered_from,
+        covered_to=covered_to,
+        revised_at=revised_at,
+        **estimator.state(),
+    )
+    return buffer.getvalue()
+
+
+def _decode(tickers, blob):
+    arrays = np.load(io.BytesIO(blob), allow_pickle=False)
+    coverage = None
+    if "revised_at" in arrays.files:
+        coverage = (arrays["covered_from"], arrays["covered_to"], arrays["revised_at"])
+    return OnlineCovariance.from_state(tickers, arrays), arrays["prices"], coverage
+
+
+def _is_stale(folded, current, last_date):
+    # Bars stored since the last fold for dates it already covered were never
+    # folded in, and the forward fill turned their gap into a return. That
+    # happens when history is backfilled to an earlier start, when a ticker
+    # that lagged behind the rest of the universe catches up, and when a
+    # ticker's history is reloaded after a split or dividend.
+    if folded is None:
+        return True
+    folded_from, folded_to, folded_revision = folded
+    current_from, current_to, current_revision = current
+    backfilled = current_from != folded_from
+    caught_up = (folded_to < last_date) & (current_to > folded_to)
+    revised = current_revision != folded_revision
+    return bool(np.any(backfilled | caught_up | revised))
+
+
+def _fold_new_bars(estimator, last_prices, tickers, since):
+    # Only completed sessions are folded in: today's bar can still be an
+    # intraday price and would be revised by the next sync.
+    today = datetime.now().strftime("%Y-%m-%d")
+    closes = load_price_history(tickers, period=HISTORY_PERIOD, sync=False, start=since, end=today)
+    if closes.empty:
+        return last_prices, None
+
+    closes = closes.reindex(columns=tickers)
+    dates = closes.index.strftime("%Y-%m-%d")
+    for date, row in zip(dates, closes.to_numpy(dtype=float)):
+        # Forward-fill each ticker's last close, as the pages do before pct_change.
+        prices = row if last_prices is None else np.where(np.isnan(row), last_prices, row)
+        if last_prices is not None:
+            with np.errstate(invalid="ignore", divide="ignore"):
+                estimator.update(date, prices / last_prices - 1.0)
+        last_prices = prices
+    return last_prices, dates[-1]
+
+
+def load_covariance(tickers, window=DEFAULT_WINDOW, decay=EWMA_DECAY, sync=True):
+    tickers = sorted({str(ticker).strip().upper() for ticker in tickers} - {""})
+    if not tickers:
+        return None
+
+    if sync:
+        sync_price_history(tickers, period=HISTORY_PERIOD)
+
+    universe = fingerprint(tickers, int(window), float(decay))
+    with _lock:
+        with connect() as conn:
+            _ensure_schema(conn)
+            row = conn.execute(
+                "SELECT last_date, state FROM covariance_state WHERE universe = ?",
+                (universe,),
+            ).fetchone()
+
+        coverage = _coverage(tickers, load_sync_state(tickers))
+        if row is not None:
+            estimator, last_prices, folded = _decode(tickers, row[1])
+            if _is_stale(folded, coverage, row[0]):
+                row = None
+        if row is None:
+            estimator, last_prices, since = OnlineCovariance(tickers, window=window, decay=decay), None, None
+        else:
+            since = (datetime.strptime(row[0], "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d")
+
+        last_prices, last_date = _fold_new_bars(estimator, last_prices, tickers, since)
+        if last_date is not None:
+            with connect() as conn:
+                conn.execute(
+                    """
+                    INSERT OR REPLACE INTO covariance_state (universe, tickers, last_date, state, updated_at)
+                    VALUES (?, ?, ?, ?, ?)
+                    """,
+                    (
+                        universe,
+                        ",".join(tickers),
+                        last_date,
+                        _encode(estimator, last_prices, coverage),
+                        datetime.now().isoformat(),
+                    ),
+                )
+                # Every change of holdings is a new universe; old ones are dropped.
+                conn.execute(
+                    """
+                    DELETE FROM covariance_state WHERE universe NOT IN (
+                        SELECT universe FROM covariance_state ORDER BY updated_at DESC LIMIT ?
+                    )
+                    """,
+                    (MAX_STATES,),
+                )
+    return estimator if estimator.observations else None
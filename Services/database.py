@@ -0,0 +1,78 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from sqlalchemy import create_engine
+from sqlalchemy.pool import QueuePool
+
+
+# SHARED DATABASE ACCESS
+# One pooled engine per process for portfolio.db. Every connection runs in WAL
+# mode, so the price refresher's writes no longer block page reads, and waits
+# on a busy database instead of failing with "database is locked".
+DB_PATH = os.getenv(
+    "PORTFOLIO_DB_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "portfolio.db"),
+)
+
+BUSY_TIMEOUT_SECONDS = float(os.getenv("DB_BUSY_TIMEOUT_SECONDS", "15"))
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))
+MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "8"))
+# Page cache per connection (KiB) and memory-mapped reads (bytes).
+CACHE_SIZE_KB = int(os.getenv("DB_CACHE_SIZE_KB", "32768"))
+MMAP_SIZE = int(os.getenv("DB_MMAP_SIZE", str(256 * 1024 * 1024)))
+
+_lock = threading.Lock()
+_engine = None
+_engine_pid = None
+
+
+def new_connection():
+    conn = sqlite3.connect(DB_PATH, timeout=BUSY_TIMEOUT_SECONDS, check_same_thread=False)
+    # WAL lets readers run alongside the single writer; with it, NORMAL sync is
+    # still crash-safe and avoids an fsync per commit.
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA busy_timeout={int(BUSY_TIMEOUT_SECONDS * 1000)}")
+    conn.execute(f"PRAGMA cache_size=-{CACHE_SIZE_KB}")
+    conn.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA foreign_keys=ON")
+    return conn
+
+
+def get_engine():
+    global _engine, _engine_pid
+    with _lock:
+        # Forked workers (background callbacks, simulation pools) must not
+        # reuse the parent's pooled connections.
+        if _engine is None or _engine_pid != os.getpid():
+            if _engine is not None:
+                _engine.dispose(close=False)
+            _engine = create_engine(
+                "sqlite://",
+                creator=new_connection,
+                poolclass=QueuePool,
+                pool_size=POOL_SIZE,
+                max_overflow=MAX_OVERFLOW,
+            )
+            _engine_pid = os.getpid()
+        return _engine
+
+
+@contextmanager
+def connect():
+    # A pooled sqlite3 connection that commits on success and rolls back on
+    # error, like "with sqlite3.connect(...)", then goes back to the pool.
+    pooled = get_engine().raw_connection()
+    conn = pooled.driver_connection
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.row_factory = None
+        pooled.close()
@@ -0,0 +1,101 @@
+import os
+import threading
+
+import pandas as pd
+
+from Services.database import new_connection
+
+
+# HOLDINGS ACCESS
+# Every page reads the portfolio table through here. The typed DataFrame is
+# built once and reused until SQLite reports a commit from any connection
+# (PRAGMA data_version), so repeat reads cost a pragma and a copy instead of a
+# connection, a query and a DataFrame build.
+HOLDING_COLUMNS = [
+    "id",
+    "ticker",
+    "shares",
+    "avg_price",
+    "current_price",
+    "market_value",
+    "last_updated",
+    "Total_Profit_Loss",
+    "holding_type",
+]
+NUMERIC_COLUMNS = ["shares", "avg_price", "current_price", "market_value", "Total_Profit_Loss"]
+
+_lock = threading.Lock()
+_schema_ready = False
+_conn = None
+_conn_pid = None
+_version = None
+_holdings = None
+
+
+def _ensure_schema(conn):
+    global _schema_ready
+    if _schema_ready:
+        return
+
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS portfolio (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            ticker TEXT,
+            shares REAL,
+            avg_price REAL,
+            current_price REAL,
+            market_value REAL,
+            last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            Total_Profit_Loss REAL
+        )
+        """
+    )
+    existing_columns = {row[1] for row in conn.execute("PRAGMA table_info(portfolio)").fetchall()}
+    if "holding_type" not in existing_columns:
+        conn.execute("ALTER TABLE portfolio ADD COLUMN holding_type TEXT")
+    # Writers store tickers normalized; rows from before that are brought in
+    # line so lookups can match on the indexed column directly.
+    conn.execute("UPDATE portfolio SET ticker = UPPER(TRIM(ticker)) WHERE ticker != UPPER(TRIM(ticker))")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_portfolio_ticker ON portfolio (ticker)")
+    conn.commit()
+    _schema_ready = True
+
+
+def _connection():
+    # data_version only moves for commits made by other connections, so this
+    # connection is kept for reads. Forked workers open their own.
+    global _conn, _conn_pid, _version
+    if _conn is None or _conn_pid != os.getpid():
+        _conn = new_connection()
+        _conn_pid = os.getpid()
+        _version = None
+        _ensure_schema(_conn)
+    return _conn
+
+
+def _read_holdings(conn):
+    columns = ", ".join(HOLDING_COLUMNS)
+    df = pd.read_sql(f"SELECT {columns} FROM portfolio", conn)
+
+    df["ticker"] = df["ticker"].fillna("").astype(str).str.strip().str.upper()
+    df = df[df["ticker"] != ""].reset_index(drop=True)
+    for column in NUMERIC_COLUMNS:
+        df[column] = pd.to_numeric(df[column], errors="coerce").astype(float)
+
+    # Market value, or shares x price when the stored value is missing.
+    fallback_value = df["shares"].fillna(0) * df["current_price"].fillna(0)
+    position_value = df["market_value"].where(df["market_value"] > 0, fallback_value)
+    df["position_value"] = position_value.where(position_value > 0, 0.0).fillna(0.0)
+    return df
+
+
+def load_holdings():
+    global _version, _holdings
+    with _lock:
+        conn = _connection()
+        version = conn.execute("PRAGMA data_version").fetchone()[0]
+        if _holdings is None or version != _version:
+            _holdings = _read_holdings(conn)
+            _version = version
+        return _holdings.copy()
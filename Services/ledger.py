@@ -0,0 +1,321 @@
+import sys
+import threading
+from datetime import datetime
+
+import pandas as pd
+
+from Services.database import connect
+
+
+# TRANSACTION LEDGER
+# Trades are appended to the transactions table and never edited. The portfolio
+# rows are the materialized positions: each write folds in only the
+# transactions recorded since the last one (average cost), so the rows the
+# dashboard reads stay one per holding however long the ledger grows. A trade
+# dated before ones already applied replays its ticker, so positions always
+# equal a rebuild in trade-date order.
+#
+# Holdings entered before the ledger existed are seeded as opening balances and
+# replay before every dated trade. Importing trades that those holdings already
+# include counts them twice: import only what happened after the seed, or
+# start from an empty portfolio and import the full history.
+OPENING_BALANCE_NOTE = "opening balance"
+OPENING_BALANCE_DATE = "0001-01-01"
+# Rounding residue left by fractional sells still counts as a closed position.
+SHARE_TOLERANCE = 1e-9
+# Order trades are folded in, by the incremental path and a rebuild alike.
+REPLAY_ORDER = "note IS NOT :opening_note, trade_date, id"
+
+_lock = threading.Lock()
+_schema_ready = False
+
+
+def _ensure_schema(conn):
+    global _schema_ready
+    if _schema_ready:
+        return
+
+    conn.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS transactions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            ticker TEXT NOT NULL,
+            trade_date TEXT NOT NULL,
+            side TEXT NOT NULL CHECK (side IN ('buy', 'sell')),
+            shares REAL NOT NULL CHECK (shares > 0),
+            price REAL,
+            holding_type TEXT,
+            note TEXT,
+            recorded_at TIMESTAMP
+        );
+        CREATE INDEX IF NOT EXISTS idx_transactions_ticker_date ON transactions (ticker, trade_date);
+        CREATE INDEX IF NOT EXISTS idx_transactions_date ON transactions (trade_date);
+
+        CREATE TABLE IF NOT EXISTS ledger_state (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            applied_through INTEGER NOT NULL
+        );
+        """
+    )
+    _begin_write(conn)
+    if conn.execute("SELECT 1 FROM ledger_state").fetchone() is None:
+        _seed_from_positions(conn)
+    conn.commit()
+    _schema_ready = True
+
+
+def _begin_write(conn):
+    # Take the database write lock before reading the ledger state, so two
+    # processes (the app, a CLI import, background jobs) cannot both apply the
+    # same pending transactions; _lock only covers threads of one process.
+    conn.execute("BEGIN IMMEDIATE")
+
+
+def _seed_from_positions(conn):
+    # Positions entered before the ledger existed become one opening buy each;
+    # they are already in the portfolio table, so they count as applied. Their
+    # real trade dates are unknown (last_updated moves with every refresh), so
+    # they get a date that sorts before any trade.
+    now = datetime.now()
+    conn.execute(
+        """
+        INSERT INTO transactions (ticker, trade_date, side, shares, price, holding_type, note, recorded_at)
+        SELECT UPPER(TRIM(ticker)), :opening_date, 'buy', shares, avg_price, holding_type, :note, :now
+        FROM portfolio
+        WHERE TRIM(COALESCE(ticker, '')) != '' AND shares > 0
+        ORDER BY rowid
+        """,
+        {"opening_date": OPENING_BALANCE_DATE, "note": OPENING_BALANCE_NOTE, "now": now.isoformat()},
+    )
+    applied = conn.execute("SELECT COALESCE(MAX(id), 0) FROM transactions").fetchone()[0]
+    conn.execute("INSERT INTO ledger_state (id, applied_through) VALUES (1, ?)", (applied,))
+
+
+def _positions(conn, tickers):
+    placeholders = ", ".join("?" for _ in tickers)
+    rows = conn.execute(
+        f"""
+        SELECT rowid, UPPER(TRIM(ticker)), shares, avg_price, current_price, holding_type
+        FROM portfolio
+        WHERE UPPER(TRIM(ticker)) IN ({placeholders})
+        ORDER BY rowid DESC
+        """,
+        tickers,
+    ).fetchall()
+    # The oldest row of a ticker is its position.
+    return {
+        row[1]: {"rowid": row[0], "shares": row[2] or 0.0, "avg_price": row[3] or 0.0,
+                 "current_price": row[4], "holding_type": row[5]}
+        for row in rows
+    }
+
+
+def _fold(position, side, shares, price, holding_type):
+    if side == "buy":
+        total = position["shares"] + shares
+        cost = position["shares"] * position["avg_price"] + shares * (price if price is not None else position["avg_price"])
+        position["avg_price"] = cost / total if total > 0 else 0.0
+        position["shares"] = total
+    else:
+        # A sell never goes below flat; a closed position starts afresh, so
+        # the incremental path and a rebuild agree on what follows it.
+        position["shares"] = position["shares"] - shares
+        if position["shares"] <= SHARE_TOLERANCE:
+            position["shares"], position["avg_price"] = 0.0, 0.0
+    if holding_type:
+        position["holding_type"] = holding_type
+
+
+def _write_positions(conn, positions, now):
+    updates, inserts, closed = [], [], []
+    for ticker, position in positions.items():
+        if position["shares"] <= 0:
+            if position.get("rowid") is not None:
+                closed.append((position["rowid"],))
+            continue
+
+        current_price = position.get("current_price") or 0.0
+        price_basis = current_price if current_price else position["avg_price"]
+        values = {
+            "ticker": ticker,
+            "shares": position["shares"],
+            "avg_price": position["avg_price"],
+            "current_price": current_price,
+            "market_value": price_basis * position["shares"],
+            "profit_loss": (current_price - position["avg_price"]) * position["shares"] if current_price else 0.0,
+            "holding_type": position.get("holding_type"),
+            "last_updated": now,
+            "rowid": position.get("rowid"),
+        }
+        (updates if values["rowid"] is not None else inserts).append(values)
+
+    conn.executemany(
+        """
+        UPDATE portfolio
+        SET shares = :shares, avg_price = :avg_price, market_value = :market_value,
+            Total_Profit_Loss = :profit_loss, holding_type = :holding_type, last_updated = :last_updated
+        WHERE rowid = :rowid
+        """,
+        updates,
+    )
+    conn.executemany(
+        """
+        INSERT INTO portfolio (ticker, shares, avg_price, current_price, market_value,
+                               Total_Profit_Loss, holding_type, last_updated)
+        VALUES (:ticker, :shares, :avg_price, :current_price, :market_value,
+                :profit_loss, :holding_type, :last_updated)
+        """,
+        inserts,
+    )
+    conn.executemany("DELETE FROM portfolio WHERE rowid = ?", closed)
+
+
+def _apply_pending(conn):
+    applied = conn.execute("SELECT applied_through FROM ledger_state WHERE id = 1").fetchone()[0]
+    pending = conn.execute(
+        f"""
+        SELECT id, ticker, trade_date, side, shares, price, holding_type FROM transactions
+        WHERE id > :applied ORDER BY {REPLAY_ORDER}
+        """,
+        {"applied": applied, "opening_note": OPENING_BALANCE_NOTE},
+    ).fetchall()
+    if not pending:
+        return 0
+
+    tickers = sorted({row[1] for row in pending})
+    positions = _positions(conn, tickers)
+    # A trade dated before one already applied changes the average cost of
+    # everything after it, so its ticker is replayed from the start.
+    placeholders = ", ".join("?" for _ in tickers)
+    latest = dict(conn.execute(
+        f"""
+        SELECT ticker, MAX(trade_date) FROM transactions
+        WHERE id <= ? AND ticker IN ({placeholders}) GROUP BY ticker
+        """,
+        [applied, *tickers],
+    ).fetchall())
+    backdated = sorted({ticker for _, ticker, trade_date, *_ in pending if trade_date < latest.get(ticker, "")})
+    folds = [row[1:] for row in pending if row[1] not in backdated]
+    for ticker in backdated:
+        existing = positions.get(ticker, {})
+        positions[ticker] = {"shares": 0.0, "avg_price": 0.0, "rowid": existing.get("rowid"),
+                             "current_price": existing.get("current_price")}
+        folds += conn.execute(
+            f"""
+            SELECT ticker, trade_date, side, shares, price, holding_type FROM transactions
+            WHERE ticker = :ticker ORDER BY {REPLAY_ORDER}
+            """,
+            {"ticker": ticker, "opening_note": OPENING_BALANCE_NOTE},
+        ).fetchall()
+
+    for ticker, _, side, shares, price, holding_type in folds:
+        position = positions.setdefault(ticker, {"shares": 0.0, "avg_price": 0.0})
+        _fold(position, side, shares, price, holding_type)
+
+    _write_positions(conn, positions, datetime.now().isoformat())
+    conn.execute("UPDATE ledger_state SET applied_through = ? WHERE id = 1", (max(row[0] for row in pending),))
+    return len(pending)
+
+
+def record_transactions(transactions):
+    # transactions: dicts with ticker, side ("buy"/"sell"), shares and
+    # optionally price, trade_date, holding_type and note. All of them are
+    # appended and applied in one database transaction.
+    now = datetime.now()
+    rows = []
+    for transaction in transactions:
+        ticker = str(transaction.get("ticker") or "").strip().upper()
+        side = transaction.get("side")
+        shares = float(transaction.get("shares") or 0)
+        if not ticker:
+            raise ValueError("Ticker is required.")
+        if side not in {"buy", "sell"}:
+            raise ValueError("Invalid transaction side supplied.")
+        if shares <= 0:
+            raise ValueError("Shares must be positive.")
+        price = transaction.get("price")
+        rows.append(
+            {
+                "ticker": ticker,
+                "trade_date": str(transaction.get("trade_date") or now.strftime("%Y-%m-%d"))[:10],
+                "side": side,
+                "shares": shares,
+                "price": None if price is None else float(price),
+                "holding_type": transaction.get("holding_type"),
+                "note": transaction.get("note"),
+                "recorded_at": now.isoformat(),
+            }
+        )
+
+    with _lock, connect() as conn:
+        _ensure_schema(conn)
+        _begin_write(conn)
+        conn.executemany(
+            """
+            INSERT INTO transactions (ticker, trade_date, side, shares, price, holding_type, note, recorded_at)
+            VALUES (:ticker, :trade_date, :side, :shares, :price, :holding_type, :note, :recorded_at)
+            """,
+            rows,
+        )
+        return _apply_pending(conn)
+
+
+def apply_transactions():
+    with _lock, connect() as conn:
+        _ensure_schema(conn)
+        _begin_write(conn)
+        return _apply_pending(conn)
+
+
+def rebuild_positions():
+    # Replays the whole ledger, opening balances first and then in trade-date
+    # order; current prices survive.
+    with _lock, connect() as conn:
+        _ensure_schema(conn)
+        _begin_write(conn)
+        tickers = [row[0] for row in conn.execute(
+            """
+            SELECT UPPER(TRIM(ticker)) FROM portfolio WHERE TRIM(COALESCE(ticker, '')) != ''
+            UNION SELECT ticker FROM transactions
+            """
+        ).fetchall()]
+        existing = _positions(conn, tickers) if tickers else {}
+
+        positions = {}
+        for ticker, side, shares, price, holding_type in conn.execute(
+            f"""
+            SELECT ticker, side, shares, price, holding_type FROM transactions
+            ORDER BY {REPLAY_ORDER}
+            """,
+            {"opening_note": OPENING_BALANCE_NOTE},
+        ):
+            position = positions.setdefault(ticker, {"shares": 0.0, "avg_price": 0.0})
+            _fold(position, side, shares, price, holding_type)
+
+        for ticker, row in existing.items():
+            position = positions.setdefault(ticker, {"shares": 0.0, "avg_price": 0.0})
+            position["rowid"] = row["rowid"]
+            position["current_price"] = row["current_price"]
+
+        # Duplicate rows of a ticker collapse into its first row.
+        keep = ", ".join(str(row["rowid"]) for row in existing.values()) or "NULL"
+        conn.execute(
+            f"""
+            DELETE FROM portfolio
+            WHERE TRIM(COALESCE(ticker, '')) != '' AND rowid NOT IN ({keep})
+            """
+        )
+        _write_positions(conn, positions, datetime.now().isoformat())
+        applied = conn.execute("SELECT COALESCE(MAX(id), 0) FROM transactions").fetchone()[0]
+        conn.execute("UPDATE ledger_state SET applied_through = ? WHERE id = 1", (applied,))
+    return len(positions)
+
+
+if __name__ == "__main__":
+    # python -m Services.ledger trades.csv   (ticker, side, shares, price, trade_date[, holding_type])
+    # python -m Services.ledger rebuild
+    if len(sys.argv) > 1 and sys.argv[1] != "rebuild":
+        trades = pd.read_csv(sys.argv[1]).astype(object).where(lambda df: df.notna(), None)
+        print(f"Applied {record_transactions(trades.to_dict('records'))} transactions.")
+    else:
+        print(f"Rebuilt {rebuild_positions()} positions from the ledger.")
@@ -0,0 +1,143 @@
+import os
+import threading
+import time
+
+import pandas as pd
+import yfinance as yf
+
+
+# MARKET DATA ACCESS
+# Every Yahoo request goes through here. Identical requests already in flight are
+# merged into one download, and a global token bucket keeps bursts of page loads
+# under Yahoo's throttling threshold.
+REQUESTS_PER_SECOND = float(os.getenv("MARKET_DATA_REQUESTS_PER_SECOND", "4"))
+BURST = int(os.getenv("MARKET_DATA_BURST", "8"))
+REQUEST_TIMEOUT_SECONDS = float(os.getenv("PRICE_FETCH_TIMEOUT_SECONDS", "10"))
+
+
+class _TokenBucket:
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = max(capacity, 1)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        waited = False
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = (1 - self.tokens) / self.rate
+            waited = True
+            time.sleep(delay)
+
+
+class _Flight:
+    def __init__(self, start):
+        self.start = start
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+_bucket = _TokenBucket(REQUESTS_PER_SECOND, BURST)
+_lock = threading.Lock()
+_download_lock = threading.Lock()
+_in_flight = {}
+_stats = {
+    "requests": 0,
+    "downloads": 0,
+    "coalesced": 0,
+    "throttled": 0,
+    "errors": 0,
+}
+
+
+def _count(key, amount=1):
+    with _lock:
+        _stats[key] += amount
+
+
+def stats():
+    with _lock:
+        snapshot = dict(_stats)
+    snapshot["saved_downloads"] = snapshot["coalesced"]
+    return snapshot
+
+
+def _throttled_call(func, *args, **kwargs):
+    if _bucket.acquire():
+        _count("throttled")
+    _count("downloads")
+    try:
+        return func(*args, **kwargs)
+    except Exception:
+        _count("errors")
+        raise
+
+
+def _download_ticker(ticker, start):
+    # Ticker.history keeps its state per object, unlike yf.download which shares
+    # module-level buffers and cannot be called from several threads at once.
+    history = yf.Ticker(ticker).history(
+        start=start.strftime("%Y-%m-%d"),
+        interval="1d",
+        auto_adjust=True,
+        timeout=REQUEST_TIMEOUT_SECONDS,
+    )
+    if history is None or history.empty or "Close" not in history.columns:
+        return pd.Series(dtype=float)
+    return history["Close"]
+
+
+def fetch_daily_closes(ticker, start):
+    # A request joins any in-flight download of the same ticker that starts on or
+    # before its own start date; the extra older bars are harmless to callers.
+    start = pd.Timestamp(start).normalize()
+    with _lock:
+        _stats["requests"] += 1
+        flight = next(
+            (pending for pending in _in_flight.get(ticker, []) if pending.start <= start),
+            None,
+        )
+        leader = flight is None
+        if leader:
+            flight = _Flight(start)
+            _in_flight.setdefault(ticker, []).append(flight)
+        else:
+            _stats["coalesced"] += 1
+
+    if not leader:
+        flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    try:
+        flight.result = _throttled_call(_download_ticker, ticker, start)
+        return flight.result
+    except Exception as exc:
+        flight.error = exc
+        raise
+    finally:
+        with _lock:
+            flights = _in_flight.get(ticker, [])
+            if flight in flights:
+                flights.remove(flight)
+            if not flights:
+                _in_flight.pop(ticker, None)
+        flight.done.set()
+
+
+def download(tickers, **kwargs):
+    # Batched yf.download calls (e.g. the quote refresh) share the rate limit but
+    # are not coalesced. yf.download is not safe to run concurrently, so they are
+    # also serialized.
+    with _download_lock:
+        return _throttled_call(yf.download, tickers=tickers, **kwargs)
@@ -0,0 +1,417 @@
+import logging
+import os
+import re
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from Services.database import connect
+from Services.market_data import fetch_daily_closes
+
+
+# LOCAL DAILY PRICE HISTORY
+# Adjusted daily closes live next to the holdings in portfolio.db. Pages read from
+# here and only the bars missing since the last stored date are downloaded. Yahoo
+# re-adjusts the whole history after a split or dividend; when an overlapping
+# bar comes back changed, the ticker's stored history is downloaded again.
+
+# A ticker is checked against Yahoo at most this often, however many pages ask for it.
+SYNC_INTERVAL = timedelta(hours=1)
+
+# Concurrent per-ticker downloads and how long a single ticker may take.
+FETCH_WORKERS = int(os.getenv("PRICE_FETCH_WORKERS", "8"))
+FETCH_TIMEOUT_SECONDS = float(os.getenv("PRICE_FETCH_TIMEOUT_SECONDS", "10"))
+# Relative change of a completed bar that counts as a new adjustment rather than
+# rounding in Yahoo's adjustment factors.
+REVISION_TOLERANCE = 1e-5
+
+_PERIOD_PATTERN = re.compile(r"^(\d+)(d|wk|mo|y)$")
+
+logger = logging.getLogger(__name__)
+
+_schema_ready = False
+
+
+def _ensure_schema(conn):
+    global _schema_ready
+    if _schema_ready:
+        return
+
+    conn.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS price_history (
+            ticker TEXT NOT NULL,
+            date TEXT NOT NULL,
+            close REAL,
+            PRIMARY KEY (ticker, date)
+        ) WITHOUT ROWID;
+
+        CREATE TABLE IF NOT EXISTS price_history_sync (
+            ticker TEXT PRIMARY KEY,
+            covered_from TEXT,
+            last_date TEXT,
+            synced_at TIMESTAMP,
+            revised_at TIMESTAMP
+        );
+        """
+    )
+    existing_columns = {row[1] for row in conn.execute("PRAGMA table_info(price_history_sync)").fetchall()}
+    if "revised_at" not in existing_columns:
+        conn.execute("ALTER TABLE price_history_sync ADD COLUMN revised_at TIMESTAMP")
+    _schema_ready = True
+
+
+def _period_start(period, today=None):
+    today = pd.Timestamp(today or datetime.now()).normalize()
+    if period == "max":
+        return pd.Timestamp("1970-01-01")
+
+    match = _PERIOD_PATTERN.match(str(period))
+    if not match:
+        raise ValueError(f"Unsupported history period: {period}")
+
+    amount, unit = int(match.group(1)), match.group(2)
+    if unit == "d":
+        return today - pd.DateOffset(days=amount)
+    if unit == "wk":
+        return today - pd.DateOffset(weeks=amount)
+    if unit == "mo":
+        return today - pd.DateOffset(months=amount)
+    return today - pd.DateOffset(years=amount)
+
+
+def _normalize_tickers(tickers):
+    normalized = []
+    seen = set()
+    for ticker in tickers:
+        symbol = str(ticker).strip().upper()
+        if symbol and symbol not in seen:
+            seen.add(symbol)
+            normalized.append(symbol)
+    return normalized
+
+
+def extract_closes(data, symbols):
+    if data is None or data.empty:
+        return pd.DataFrame()
+
+    # yfinance returns ('Close', 'AAPL') style MultiIndex columns for batches and,
+    # depending on version, for single tickers too.
+    if isinstance(data.columns, pd.MultiIndex):
+        level0 = set(data.columns.get_level_values(0))
+        if "Adj Close" in level0:
+            prices = data["Adj Close"]
+        elif "Close" in level0:
+            prices = data["Close"]
+        else:
+            return pd.DataFrame()
+
+        if isinstance(prices, pd.Series):
+            prices = prices.to_frame()
+
+        prices = prices.copy()
+        prices.columns = [str(column).upper().strip() for column in prices.columns]
+        return prices
+
+    if "Adj Close" in data.columns:
+        series = data["Adj Close"]
+    elif "Close" in data.columns:
+        series = data["Close"]
+    else:
+        return pd.DataFrame()
+
+    symbol = symbols[0].upper().strip() if symbols else "PRICE"
+    return series.to_frame(name=symbol)
+
+
+def _download_closes(tickers, start):
+    # Each ticker gets FETCH_TIMEOUT_SECONDS from when its download starts. Threads
+    # cannot be stopped, so a hung download keeps its worker; the batch as a whole
+    # gives up once every worker could have run FETCH_TIMEOUT_SECONDS per ticker.
+    # Tickers that fail or time out are left out of `completed` and are retried
+    # on the next sync.
+    closes = {}
+    completed = []
+    started = {}
+
+    def fetch(ticker):
+        started[ticker] = time.monotonic()
+        return fetch_daily_closes(ticker, start)
+
+    executor = ThreadPoolExecutor(max_workers=min(FETCH_WORKERS, len(tickers)))
+    futures = {executor.submit(fetch, ticker): ticker for ticker in tickers}
+    rounds = -(-len(tickers) // FETCH_WORKERS)
+    deadline = time.monotonic() + FETCH_TIMEOUT_SECONDS * rounds + 1
+    pending = set(futures)
+    try:
+        while pending:
+            now = time.monotonic()
+            overdue = {
+                future for future in pending
+                if futures[future] in started and now - started[futures[future]] > FETCH_TIMEOUT_SECONDS
+            }
+            if now >= deadline:
+                overdue = pending
+            if overdue:
+                logger.warning("Timed out downloading %s", ", ".join(sorted(futures[future] for future in overdue)))
+                pending -= overdue
+                continue
+            # Wake when the earliest running ticker runs out of time; a ticker
+            # that starts during the wait is checked on the next pass.
+            expiries = [started[futures[future]] + FETCH_TIMEOUT_SECONDS
+                        for future in pending if futures[future] in started]
+            wake = min(expiries + [now + FETCH_TIMEOUT_SECONDS, deadline])
+            done, pending = wait(pending, timeout=max(wake - now, 0) + 0.01, return_when=FIRST_COMPLETED)
+            for future in done:
+                ticker = futures[future]
+                try:
+                    series = future.result()
+                except Exception as exc:
+                    logger.warning("Failed to download %s: %s", ticker, exc)
+                    continue
+                completed.append(ticker)
+                if not series.empty:
+                    closes[ticker] = series
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    if not closes:
+        return pd.DataFrame(), completed
+
+    # Exchanges report bars in their own timezone; only the trading date is kept.
+    frame = pd.DataFrame(
+        {
+            ticker: pd.Series(series.to_numpy(), index=series.index.strftime("%Y-%m-%d"))
+            for ticker, series in closes.items()
+        }
+    )
+    frame.index = pd.to_datetime(frame.index)
+    return frame, completed
+
+
+def _plan_sync(conn, tickers, start, now):
+    placeholders = ",".join("?" for _ in tickers)
+    rows = conn.execute(
+        f"""
+        SELECT ticker, covered_from, last_date, synced_at,
+               (SELECT MAX(date) FROM price_history
+                WHERE price_history.ticker = price_history_sync.ticker AND date < last_date)
+        FROM price_history_sync
+        WHERE ticker IN ({placeholders})
+        """,
+        tickers,
+    ).fetchall()
+    state = {row[0]: row[1:] for row in rows}
+
+    # Tickers never seen (or stored from a later start) need the full window; the
+    # rest are grouped by their last stored bar so each group is one batched request.
+    full = []
+    incremental = {}
+    for ticker in tickers:
+        covered_from, last_date, synced_at, previous_date = state.get(ticker, (None, None, None, None))
+        if covered_from is None or covered_from > start.strftime("%Y-%m-%d"):
+            full.append(ticker)
+            continue
+
+        if synced_at is not None and now - pd.Timestamp(synced_at) < SYNC_INTERVAL:
+            continue
+
+        # Re-request the last two stored bars: the last may have been an intraday
+        # close, and the completed one before it shows whether Yahoo has since
+        # re-adjusted the history.
+        fetch_from = pd.Timestamp(previous_date or last_date) if last_date else start
+        incremental.setdefault(fetch_from, []).append(ticker)
+
+    return full, incremental
+
+
+def _store_closes(conn, closes, tickers, covered_from, now):
+    rows = []
+    last_dates = {}
+    for ticker in tickers:
+        if ticker not in closes.columns:
+            continue
+        series = closes[ticker].dropna()
+        if series.empty:
+            continue
+        dates = series.index.strftime("%Y-%m-%d")
+        rows.extend(zip([ticker] * len(series), dates, series.astype(float).tolist()))
+        last_dates[ticker] = dates[-1]
+
+    conn.executemany(
+        "INSERT OR REPLACE INTO price_history (ticker, date, close) VALUES (?, ?, ?)",
+        rows,
+    )
+
+    # Tickers that came back empty are still marked as synced so an unknown or
+    # delisted symbol is not retried on every page load.
+    conn.executemany(
+        """
+        INSERT INTO price_history_sync (ticker, covered_from, last_date, synced_at)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT(ticker) DO UPDATE SET
+            covered_from = COALESCE(
+                MIN(price_history_sync.covered_from, excluded.covered_from),
+                price_history_sync.covered_from,
+                excluded.covered_from
+            ),
+            last_date = COALESCE(
+                MAX(price_history_sync.last_date, excluded.last_date),
+                price_history_sync.last_date,
+                excluded.last_date
+            ),
+            synced_at = excluded.synced_at
+        """,
+        [
+            (ticker, covered_from, last_dates.get(ticker), now.isoformat())
+            for ticker in tickers
+        ],
+    )
+
+
+def _revised_tickers(conn, closes, tickers):
+    # Tickers whose downloaded closes differ from the stored completed bars
+    # (everything before the stored last_date) on the dates both have.
+    revised = []
+    for ticker in tickers:
+        if ticker not in closes.columns:
+            continue
+        series = closes[ticker].dropna()
+        if series.empty:
+            continue
+        dates = series.index.strftime("%Y-%m-%d")
+        stored = dict(
+            conn.execute(
+                """
+                SELECT date, close FROM price_history
+                WHERE ticker = ? AND date >= ?
+                  AND date < (SELECT last_date FROM price_history_sync WHERE ticker = ?)
+                """,
+                (ticker, dates[0], ticker),
+            ).fetchall()
+        )
+        for date, close in zip(dates, series.astype(float).tolist()):
+            if stored.get(date) and abs(close / stored[date] - 1.0) > REVISION_TOLERANCE:
+                revised.append(ticker)
+                break
+    return revised
+
+
+def _refetch_history(tickers, now):
+    # Replaces the stored history of each ticker in one transaction, from the
+    # start it already covered. A ticker that fails keeps its old bars and is
+    # not marked as synced, so the next sync detects the revision again.
+    placeholders = ",".join("?" for _ in tickers)
+    with connect() as conn:
+        starts = dict(
+            conn.execute(
+                f"SELECT ticker, covered_from FROM price_history_sync WHERE ticker IN ({placeholders})",
+                tickers,
+            ).fetchall()
+        )
+
+    groups = {}
+    for ticker in tickers:
+        groups.setdefault(starts[ticker], []).append(ticker)
+    for covered_from, group in groups.items():
+        closes, completed = _download_closes(group, pd.Timestamp(covered_from))
+        completed = [ticker for ticker in completed if ticker in closes.columns]
+        if not completed:
+            logger.warning("Could not reload revised history for %s", ", ".join(group))
+            continue
+
+        logger.info("Reloaded revised history for %s", ", ".join(completed))
+        with connect() as conn:
+            conn.executemany("DELETE FROM price_history WHERE ticker = ?", [(ticker,) for ticker in completed])
+            conn.executemany("UPDATE price_history_sync SET last_date = NULL WHERE ticker = ?",
+                             [(ticker,) for ticker in completed])
+            _store_closes(conn, closes, completed, covered_from, now)
+            conn.executemany(
+                "UPDATE price_history_sync SET revised_at = ? WHERE ticker = ?",
+                [(now.isoformat(), ticker) for ticker in completed],
+            )
+
+
+def sync_price_history(tickers, period="1y"):
+    tickers = _normalize_tickers(tickers)
+    if not tickers:
+        return
+
+    now = pd.Timestamp.now()
+    start = _period_start(period, now)
+
+    with connect() as conn:
+        _ensure_schema(conn)
+        full, incremental = _plan_sync(conn, tickers, start, now)
+
+    batches = []
+    if full:
+        batches.append((full, start, start.strftime("%Y-%m-%d")))
+    for fetch_from, group in incremental.items():
+        batches.append((group, fetch_from, None))
+
+    for group, fetch_from, covered_from in batches:
+        closes, completed = _download_closes(group, fetch_from)
+        if closes.empty:
+            # Keep serving whatever is stored; the next sync will try again.
+            logger.warning("No data returned for %s", ", ".join(group))
+            continue
+
+        with connect() as conn:
+            # Full downloads replace everything they cover anyway.
+            revised = [] if covered_from else _revised_tickers(conn, closes, completed)
+            _store_closes(conn, closes, [ticker for ticker in completed if ticker not in revised], covered_from, now)
+        if revised:
+            _refetch_history(revised, now)
+
+
+def load_sync_state(tickers):
+    # {ticker: (covered_from, last_date, revised_at)} for the tickers that have been synced.
+    tickers = _normalize_tickers(tickers)
+    if not tickers:
+        return {}
+
+    placeholders = ",".join("?" for _ in tickers)
+    with connect() as conn:
+        _ensure_schema(conn)
+        rows = conn.execute(
+            f"SELECT ticker, covered_from, last_date, revised_at FROM price_history_sync WHERE ticker IN ({placeholders})",
+            tickers,
+        ).fetchall()
+    return {row[0]: row[1:] for row in rows}
+
+
+def load_price_history(tickers, period="1y", sync=True, start=None, end=None):
+    # start (inclusive) and end (exclusive) are "YYYY-MM-DD" dates; start
+    # defaults to the beginning of period.
+    tickers = _normalize_tickers(tickers)
+    if not tickers:
+        return pd.DataFrame()
+
+    if sync:
+        sync_price_history(tickers, period=period)
+
+    start = start or _period_start(period).strftime("%Y-%m-%d")
+    end = end or "9999-12-31"
+    placeholders = ",".join("?" for _ in tickers)
+    with connect() as conn:
+        _ensure_schema(conn)
+        rows = conn.execute(
+            f"""
+            SELECT date, ticker, close FROM price_history
+            WHERE ticker IN ({placeholders}) AND date >= ? AND date < ?
+            """,
+            [*tickers, start, end],
+        ).fetchall()
+
+    if not rows:
+        return pd.DataFrame()
+
+    long = pd.DataFrame(rows, columns=["date", "ticker", "close"])
+    prices = long.pivot(index="date", columns="ticker", values="close").sort_index()
+    prices.index = pd.to_datetime(prices.index)
+    prices.index.name = None
+    prices.columns.name = None
+    return prices[[ticker for ticker in tickers if ticker in prices.columns]]
@@ -0,0 +1,61 @@
+import multiprocessing
+import os
+import threading
+
+from Services.updater import sync_history, update_prices
+
+
+# BACKGROUND PRICE REFRESH
+# One thread per process owns the refresh schedule; dashboard callbacks only
+# read the prices it persists.
+REFRESH_INTERVAL_SECONDS = int(os.getenv("PRICE_REFRESH_INTERVAL_SECONDS", "60"))
+# The process that starts the refresher records its pid here. Processes started
+# from it later (the background job fork server and its jobs) inherit the
+# variable and leave refreshing to that process.
+OWNER_PID_ENV = "PRICE_REFRESHER_PID"
+
+_lock = threading.Lock()
+_stop = threading.Event()
+_thread = None
+
+
+def _run(interval):
+    while not _stop.is_set():
+        try:
+            update_prices()
+        except Exception as exc:
+            print(f"[refresher] Price refresh failed: {exc}")
+        try:
+            sync_history()
+        except Exception as exc:
+            print(f"[refresher] History sync failed: {exc}")
+        _stop.wait(interval)
+
+
+def start_price_refresher(interval=None):
+    global _thread
+    interval = REFRESH_INTERVAL_SECONDS if interval is None else int(interval)
+    # Spawned processes (e.g. the Monte Carlo pool) re-import the app module
+    # before their parent is recorded, but already carry their own name.
+    if interval <= 0 or multiprocessing.current_process().name != "MainProcess":
+        return None
+    if os.environ.setdefault(OWNER_PID_ENV, str(os.getpid())) != str(os.getpid()):
+        return None
+
+    with _lock:
+        if _thread is not None and _thread.is_alive():
+            return _thread
+
+        _stop.clear()
+        _thread = threading.Thread(
+            target=_run,
+            args=(interval,),
+            name="price-refresher",
+            daemon=True,
+        )
+        _thread.start()
+        return _thread
+
+
+def stop_price_refresher():
+    _stop.set()
@@ -0,0 +1,177 @@
+import numpy as np
+
+
+# FACTOR (PCA) COVARIANCE
+# cov ~= B B' + diag(d) with k statistical factors. Portfolio variance costs
+# O(n k) instead of O(n^2), nothing n x n is ever built or decomposed, and the
+# estimate stays well conditioned when tickers outnumber observations.
+DEFAULT_FACTORS = 10
+
+
+class FactorCovariance:
+    def __init__(self, returns, factors=DEFAULT_FACTORS):
+        returns = np.asarray(returns, dtype=float)
+        available = ~np.isnan(returns)
+        observations = np.maximum(available.sum(axis=0), 2)
+
+        # Missing days count as "no move" once each column is demeaned; each
+        # ticker's own variance still uses only the days it traded.
+        centered = np.where(available, returns - np.nanmean(returns, axis=0), 0.0)
+        total_variance = (centered ** 2).sum(axis=0) / (observations - 1)
+
+        rows = max(returns.shape[0] - 1, 1)
+        _, singular_values, components = np.linalg.svd(centered / np.sqrt(rows), full_matrices=False)
+        factors = max(min(int(factors), singular_values.size), 1)
+
+        self.loadings = components[:factors].T * singular_values[:factors]
+        common_variance = (self.loadings ** 2).sum(axis=1)
+        self.idiosyncratic = np.clip(total_variance - common_variance, 1e-12, None)
+        self.factors = factors
+        self.explained = float(
+            (singular_values[:factors] ** 2).sum() / max((singular_values ** 2).sum(), 1e-300)
+        )
+
+    def asset_variances(self):
+        return (self.loadings ** 2).sum(axis=1) + self.idiosyncratic
+
+    def factor_exposures(self, weights):
+        return self.loadings.T @ np.asarray(weights, dtype=float)
+
+    def portfolio_variance(self, weights):
+        weights = np.asarray(weights, dtype=float)
+        exposures = self.factor_exposures(weights)
+        return float(exposures @ exposures + (self.idiosyncratic * weights ** 2).sum())
+
+
+# ONLINE COVARIANCE
+# Running sums over a moving window of daily returns plus an EWMA over every
+# return seen. Adding or dropping a day is a rank-1 O(n^2) update, and sample,
+# EWMA and shrinkage estimates can be read at any time without revisiting
+# history. Missing returns (NaN) are handled pairwise, as in DataFrame.cov.
+DEFAULT_WINDOW = 126
+EWMA_DECAY = 0.94
+COVARIANCE_MODES = ("sample", "ewma", "shrinkage")
+
+_STATE_FIELDS = ("rows", "counts", "sums", "squares", "products", "ewma", "ewma_weight")
+
+
+class OnlineCovariance:
+    def __init__(self, tickers, window=DEFAULT_WINDOW, decay=EWMA_DECAY):
+        size = len(tickers)
+        self.tickers = list(tickers)
+        self.window = int(window)
+        self.decay = float(decay)
+        self.dates = []
+        # Ring buffer of the window's returns; the oldest row is at self.dates[0].
+        self.rows = np.full((self.window, size), np.nan)
+        self.counts = np.zeros((size, size))
+        # sums[i, j] and squares[i, j]: sum of x_i and x_i^2 over days j also traded.
+        self.sums = np.zeros((size, size))
+        self.squares = np.zeros((size, size))
+        self.products = np.zeros((size, size))
+        # Sum of |x|^4 over the window with missing returns as 0, for the shrinkage intensity.
+        self.fourth = 0.0
+        self.ewma = np.zeros((size, size))
+        self.ewma_weight = np.zeros((size, size))
+        self.updates = 0
+
+    @property
+    def observations(self):
+        return len(self.dates)
+
+    def _accumulate(self, row, sign):
+        traded = (~np.isnan(row)).astype(float)
+        values = np.nan_to_num(row, nan=0.0)
+        self.counts += sign * np.outer(traded, traded)
+        self.sums += sign * np.outer(values, traded)
+        self.squares += sign * np.outer(values * values, traded)
+        self.products += sign * np.outer(values, values)
+        self.fourth += sign * float(values @ values) ** 2
+
+    def update(self, date, row):
+        row = np.asarray(row, dtype=float)
+        slot = self.updates % self.window
+        if self.observations == self.window:
+            self._accumulate(self.rows[slot], -1.0)
+            self.dates.pop(0)
+        self.rows[slot] = row
+        self.dates.append(date)
+        self._accumulate(row, 1.0)
+        self.updates += 1
+
+        # Zero-mean EWMA, per pair over the days both traded and normalized by
+        # the weight those days received.
+        both = np.outer(~np.isnan(row), ~np.isnan(row))
+        values = np.nan_to_num(row, nan=0.0)
+        self.ewma = np.where(both, self.decay * self.ewma + (1 - self.decay) * np.outer(values, values), self.ewma)
+        self.ewma_weight = np.where(both, self.decay * self.ewma_weight + (1 - self.decay), self.ewma_weight)
+
+    def returns(self):
+        # Window rows oldest first.
+        start = self.updates % self.window if self.observations == self.window else 0
+        return np.roll(self.rows, -start, axis=0)[:self.observations]
+
+    def sample_covariance(self):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            cov = (self.products - self.sums * self.sums.T / self.counts) / (self.counts - 1)
+        return np.where(self.counts > 1, cov, np.nan)
+
+    def correlation(self):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            variance = (self.squares - self.sums ** 2 / self.counts) / (self.counts - 1)
+            corr = self.sample_covariance() / np.sqrt(variance * variance.T)
+        corr = np.clip(corr, -1.0, 1.0)
+        np.fill_diagonal(corr, np.where(np.diag(self.counts) > 1, 1.0, np.nan))
+        return corr
+
+    def ewma_covariance(self):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(self.ewma_weight > 0, self.ewma / self.ewma_weight, np.nan)
+
+    def shrinkage_intensity(self):
+        # Ledoit-Wolf (2004) intensity towards a scaled identity, from the
+        # window's uncentred second moments: daily means are negligible next to
+        # daily volatility, and the sums above give it in O(n^2).
+        observations = self.observations
+        size = len(self.tickers)
+        if observations < 2 or size == 0:
+            return 1.0
+        moment = self.products / observations
+        scale = np.trace(moment) / size
+        dispersion = ((moment - scale * np.eye(size)) ** 2).sum() / size
+        if dispersion <= 0:
+            return 1.0
+        noise = (self.fourth / observations ** 2 - (moment ** 2).sum() / observations) / size
+        return float(np.clip(noise, 0.0, dispersion) / dispersion)
+
+    def shrunk_covariance(self):
+        cov = np.nan_to_num(self.sample_covariance(), nan=0.0)
+        intensity = self.shrinkage_intensity()
+        target = np.trace(cov) / max(cov.shape[0], 1) * np.eye(cov.shape[0])
+        return intensity * target + (1 - intensity) * cov
+
+    def covariance(self, mode="sample"):
+        if mode == "ewma":
+            return self.ewma_covariance()
+        if mode == "shrinkage":
+            return self.shrunk_covariance()
+        if mode != "sample":
+            raise ValueError(f"Unknown covariance mode: {mode}")
+        return self.sample_covariance()
+
+    def state(self):
+        arrays = {field: getattr(self, field) for field in _STATE_FIELDS}
+        arrays["scalars"] = np.array([self.window, self.decay, self.fourth, self.updates])
+        arrays["dates"] = np.array(self.dates, dtype=str)
+        return arrays
+
+    @classmethod
+    def from_state(cls, tickers, arrays):
+        window, decay, fourth, updates = arrays["scalars"]
+        estimator = cls(tickers, window=int(window), decay=decay)
+        for field in _STATE_FIELDS:
+            setattr(estimator, field, np.array(arrays[field], dtype=float))
+        estimator.fourth = float(fourth)
+        estimator.updates = int(updates)
+        estimator.dates = [str(date) for date in arrays["dates"]]
+        return estimator
@@ -0,0 +1,143 @@
+import numpy as np
+
+
+# ROLLING WINDOW STATISTICS
+# Window sums are differences of cumulative sums, so a statistic costs O(1) per
+# day and series whatever the window length: O(days x series) for a history.
+# Missing returns (NaN) are skipped, pairwise for correlations; a window needs
+# min_periods observations (the full window by default, as in pandas).
+def _window_sums(values, window):
+    cumulative = np.cumsum(values, axis=0)
+    sums = cumulative.copy()
+    sums[window:] -= cumulative[:-window]
+    return sums
+
+
+def _centered(values, traded):
+    # Variances and covariances do not depend on the mean; removing it first
+    # keeps the cumulative sums small and the differences accurate.
+    with np.errstate(invalid="ignore"):
+        mean = np.nanmean(np.where(traded, values, np.nan), axis=0)
+    return np.where(traded, values - np.nan_to_num(mean), 0.0)
+
+
+def rolling_volatility(returns, window, min_periods=None):
+    returns = np.asarray(returns, dtype=float)
+    window = max(int(window), 2)
+    min_periods = max(int(min_periods or window), 2)
+    traded = ~np.isnan(returns)
+    values = _centered(returns, traded)
+
+    counts = _window_sums(traded.astype(float), window)
+    sums = _window_sums(values, window)
+    squares = _window_sums(values * values, window)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        variance = (squares - sums * sums / counts) / (counts - 1)
+    return np.where(counts >= min_periods, np.sqrt(np.clip(variance, 0.0, None)), np.nan)
+
+
+def rolling_correlation(returns, reference, window, min_periods=None):
+    # Correlation of every column of returns with the reference series.
+    returns = np.asarray(returns, dtype=float)
+    reference = np.asarray(reference, dtype=float).reshape(-1, 1)
+    window = max(int(window), 2)
+    min_periods = max(int(min_periods or window), 2)
+    traded = ~np.isnan(returns) & ~np.isnan(reference)
+    x = _centered(returns, traded)
+    y = _centered(np.broadcast_to(reference, returns.shape), traded)
+
+    counts = _window_sums(traded.astype(float), window)
+    sum_x = _window_sums(x, window)
+    sum_y = _window_sums(y, window)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        covariance = _window_sums(x * y, window) - sum_x * sum_y / counts
+        variance_x = _window_sums(x * x, window) - sum_x * sum_x / counts
+        variance_y = _window_sums(y * y, window) - sum_y * sum_y / counts
+        correlation = covariance / np.sqrt(variance_x * variance_y)
+    return np.where(counts >= min_periods, np.clip(correlation, -1.0, 1.0), np.nan)
+
+
+def rolling_mean(returns, window, min_periods=None):
+    returns = np.asarray(returns, dtype=float)
+    window = max(int(window), 1)
+    min_periods = max(int(min_periods or window), 1)
+    traded = ~np.isnan(returns)
+
+    counts = _window_sums(traded.astype(float), window)
+    sums = _window_sums(np.where(traded, returns, 0.0), window)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = sums / counts
+    return np.where(counts >= min_periods, mean, np.nan)
+
+
+def rolling_beta(returns, reference, window, min_periods=None):
+    # Rolling OLS of every column of returns on the reference series; returns
+    # (beta, alpha) with alpha the per-period intercept.
+    returns = np.asarray(returns, dtype=float)
+    reference = np.asarray(reference, dtype=float).reshape(-1, 1)
+    window = max(int(window), 2)
+    min_periods = max(int(min_periods or window), 2)
+    traded = ~np.isnan(returns) & ~np.isnan(reference)
+    y = np.broadcast_to(reference, returns.shape)
+    x_centered = _centered(returns, traded)
+    y_centered = _centered(y, traded)
+
+    counts = _window_sums(traded.astype(float), window)
+    sum_x = _window_sums(x_centered, window)
+    sum_y = _window_sums(y_centered, window)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        covariance = _window_sums(x_centered * y_centered, window) - sum_x * sum_y / counts
+        variance_y = _window_sums(y_centered * y_centered, window) - sum_y * sum_y / counts
+        beta = covariance / variance_y
+        mean_x = _window_sums(np.where(traded, returns, 0.0), window) / counts
+        mean_y = _window_sums(np.where(traded, y, 0.0), window) / counts
+        alpha = mean_x - beta * mean_y
+    complete = counts >= min_periods
+    return np.where(complete, beta, np.nan), np.where(complete, alpha, np.nan)
+
+
+def _combine(older, newer):
+    # (peak, trough, drawdown) of two consecutive stretches of the wealth curve.
+    return (
+        max(older[0], newer[0]),
+        min(older[1], newer[1]),
+        min(older[2], newer[2], newer[1] - older[0]),
+    )
+
+
+def rolling_max_drawdown(returns, window):
+    # Deepest peak-to-trough fall inside each trailing window of one return
+    # series, in O(days) whatever the window. The window is a queue made of two
+    # stacks: days enter the back, whose running summary grows by one day, and
+    # leave the front, whose entries hold the summary of themselves and every
+    # newer front day. Each day moves between the stacks once.
+    returns = np.asarray(returns, dtype=float)
+    window = max(int(window), 1)
+    drawdown = np.full(len(returns), np.nan)
+    if len(returns) < window:
+        return drawdown
+
+    wealth = np.cumsum(np.log1p(np.nan_to_num(returns))).tolist()
+    front, back, back_summary = [], [], None
+    for day, value in enumerate(wealth):
+        back.append(value)
+        point = (value, value, 0.0)
+        back_summary = point if back_summary is None else _combine(back_summary, point)
+        if day >= window:
+            if not front:
+                summary = None
+                for moved in reversed(back):
+                    point = (moved, moved, 0.0)
+                    summary = point if summary is None else _combine(point, summary)
+                    front.append(summary)
+                back, back_summary = [], None
+            front.pop()
+        if day >= window - 1:
+            if not front:
+                summary = back_summary
+            elif back_summary is None:
+                summary = front[-1]
+            else:
+                summary = _combine(front[-1], back_summary)
+            drawdown[day] = summary[2]
+    return np.expm1(drawdown)
@@ -0,0 +1,622 @@
+import copy
+import multiprocessing
+import os
+import threading
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache, partial
+from multiprocessing.managers import BaseManager
+
+import numpy as np
+
+
+# STREAMING MONTE CARLO ENGINE
+# Paths are generated in time chunks sized by a memory budget. Only the running
+# log value of each path and a per-step histogram of path values are kept, so
+# memory no longer grows with horizon x paths x tickers.
+TRADING_DAYS_PER_YEAR = 252
+PERCENTILES = (5, 25, 50, 75, 95)
+MEMORY_BUDGET_MB = float(os.getenv("MC_MEMORY_BUDGET_MB", "128"))
+
+# Worker processes for the optional parallel mode (1 runs in-process) and the
+# number of paths that share one random stream.
+WORKERS = int(os.getenv("MC_WORKERS", "1"))
+SHARD_PATHS = 100
+
+# Sampling modes: "standard" pseudo-random normals, "antithetic" pairs (z, -z),
+# or "sobol" scrambled quasi-random normals laid out along a Brownian bridge.
+SAMPLING_MODES = ("standard", "antithetic", "sobol")
+SOBOL_REPLICATES = 10
+# Brownian bridges span at most one time chunk; horizons that fit in a single
+# chunk get the largest variance reduction.
+MAX_SOBOL_DIMENSIONS = 21201
+
+# Per-step bands are read from a histogram spanning +/- BAND_WIDTH standard
+# deviations of the cumulative return. With 1024 bins the resolution is ~0.01
+# standard deviations, well below the sampling error of 10,000 paths.
+BAND_BINS = 1024
+BAND_WIDTH = 6.0
+
+# float64 log values, then a float64 band position and the int64 bin index
+# computed from it in _accumulate_bands, per element.
+_BYTES_PER_ELEMENT = 24
+# Sobol draws also hold the points, their normals, the Brownian-bridge walk and
+# its permuted increments per element, and scipy's scrambling matrices per step.
+_SOBOL_BYTES_PER_ELEMENT = 40
+_SOBOL_BYTES_PER_STEP = 8 * 1024
+# Band counts are kept for the whole horizon at 4 bytes per bin; each chunk
+# step also takes an int64 bincount row and its int32 copy.
+_BAND_BYTES_PER_STEP = 4 * BAND_BINS
+_BINCOUNT_BYTES_PER_STEP = 12 * BAND_BINS
+
+# The app's simulation server, for job processes to find (see start_simulation_server).
+SERVER_ADDRESS_ENV = "MC_SERVER_ADDRESS"
+SERVER_AUTHKEY_ENV = "MC_SERVER_AUTHKEY"
+# Shard groups in flight on the server that a cancelled job can stop; groups
+# beyond this run to the end.
+CANCEL_SLOTS = 256
+
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+_server = None
+_runner = None
+_runner_pid = None
+# Pool-shared stop flags, one per slot, and the job each busy slot belongs to.
+_cancel_flags = None
+_slot_owners = {}
+
+
+class SimulationCancelled(Exception):
+    pass
+
+
+def _factorize(cov):
+    cov = np.asarray(cov, dtype=float)
+    # Small diagonal jitter improves stability when the covariance matrix is nearly singular.
+    cov = cov + np.eye(cov.shape[0]) * 1e-10
+    try:
+        return np.linalg.cholesky(cov)
+    except np.linalg.LinAlgError:
+        # Pairwise-NaN covariances need not be positive semi-definite; drop the
+        # negative eigenvalues instead of failing.
+        eigenvalues, eigenvectors = np.linalg.eigh(cov)
+        return eigenvectors * np.sqrt(np.clip(eigenvalues, 0.0, None))
+
+
+class GaussianModel:
+    # Daily log returns ~ N(mean, cov). With cov = L L' the portfolio return is
+    # w.mean + (L'w).z, so one normal draw with standard deviation |L'w| per
+    # path and step is exactly the projected multivariate normal.
+    # cov may also be a FactorCovariance: its k factor shocks and idiosyncratic
+    # terms project the same way, in O(n k) with no n x n factorization.
+    def __init__(self, mean, cov, weights):
+        weights = np.asarray(weights, dtype=float)
+        if hasattr(cov, "portfolio_variance"):
+            variance = cov.portfolio_variance(weights)
+        else:
+            loading = _factorize(cov).T @ weights
+            variance = loading @ loading
+        self.drift = float(np.asarray(mean, dtype=float) @ weights)
+        self.volatility = float(np.sqrt(max(variance, 0.0)))
+
+    def draw(self, rng, steps, paths, sampling="standard"):
+        shocks = standard_normals(rng, steps, paths, sampling)
+        shocks *= self.volatility
+        shocks += self.drift
+        return shocks
+
+
+class BlockBootstrapModel:
+    # Resamples contiguous blocks of historical days. Projecting the returns
+    # matrix onto the weights first is equivalent to indexing whole rows and
+    # keeps each day's cross-asset moves together; blocks keep fat tails and
+    # short-range autocorrelation. Days where a ticker has no history yet are
+    # weighted over the tickers that do.
+    def __init__(self, returns, weights, block_length=21):
+        returns = np.asarray(returns, dtype=float)
+        weights = np.asarray(weights, dtype=float)
+        available = ~np.isnan(returns)
+        covered = available @ weights
+        history = np.where(available, returns, 0.0) @ weights
+        history = history[covered > 0] / covered[covered > 0]
+        if history.size == 0:
+            raise ValueError("No return history to resample.")
+
+        self.history = history
+        self.block_length = max(min(int(block_length), history.size), 1)
+        self.drift = float(history.mean())
+        self.volatility = float(history.std())
+
+    def draw(self, rng, steps, paths, sampling="standard"):
+        if sampling != "standard":
+            raise ValueError("The block bootstrap resamples history; only standard sampling applies.")
+
+        blocks = -(-steps // self.block_length)
+        starts = rng.integers(0, self.history.size - self.block_length + 1, size=(blocks, 1, paths))
+        days = starts + np.arange(self.block_length)[None, :, None]
+        return self.history[days.reshape(blocks * self.block_length, paths)[:steps]]
+
+
+@lru_cache(maxsize=8)
+def _bridge_schedule(steps):
+    # Brownian-bridge fill order: the first coordinate sets the end point, the
+    # next ones the midpoints. Low-discrepancy coordinates then drive the moves
+    # that matter most for the path's distribution.
+    schedule = []
+    intervals = [(0, steps)]
+    while intervals:
+        next_intervals = []
+        for left, right in intervals:
+            if right - left < 2:
+                continue
+            middle = (left + right) // 2
+            schedule.append((
+                middle,
+                left,
+                right,
+                (right - middle) / (right - left),
+                (middle - left) / (right - left),
+                np.sqrt((middle - left) * (right - middle) / (right - left)),
+            ))
+            next_intervals.extend([(left, middle), (middle, right)])
+        intervals = next_intervals
+    return tuple(schedule)
+
+
+def _sobol_normals(rng, steps, paths):
+    from scipy.special import ndtri
+    from scipy.stats import qmc
+
+    sampler = qmc.Sobol(d=steps, scramble=True, seed=rng)
+    with warnings.catch_warnings():
+        # Path counts are rarely powers of two; the points are still scrambled Sobol.
+        warnings.simplefilter("ignore", UserWarning)
+        points = sampler.random(paths)
+    normals = ndtri(np.clip(points, 1e-12, 1 - 1e-12)).T
+
+    walk = np.zeros((steps + 1, paths))
+    walk[steps] = np.sqrt(steps) * normals[0]
+    for coordinate, (middle, left, right, left_weight, right_weight, sigma) in enumerate(_bridge_schedule(steps), 1):
+        walk[middle] = left_weight * walk[left] + right_weight * walk[right] + sigma * normals[coordinate]
+    # Each chunk is scrambled independently; shuffling the path order between
+    # chunks keeps their point sets from lining up (Latin supercube sampling).
+    return np.diff(walk, axis=0)[:, rng.permutation(paths)]
+
+
+def standard_normals(rng, steps, paths, sampling="standard"):
+    if sampling == "antithetic":
+        half = rng.standard_normal((steps, (paths + 1) // 2))
+        return np.concatenate([half, -half], axis=1)[:, :paths]
+    if sampling == "sobol":
+        blocks = [
+            _sobol_normals(rng, min(MAX_SOBOL_DIMENSIONS, steps - first), paths)
+            for first in range(0, steps, MAX_SOBOL_DIMENSIONS)
+        ]
+        return np.concatenate(blocks, axis=0)
+    if sampling != "standard":
+        raise ValueError(f"Unknown sampling mode: {sampling}")
+    return rng.standard_normal((steps, paths))
+
+
+def _chunk_steps(simulations, memory_budget_mb, sampling="standard", steps=0):
+    budget = (MEMORY_BUDGET_MB if memory_budget_mb is None else memory_budget_mb) * 1024 * 1024
+    budget -= _BAND_BYTES_PER_STEP * steps
+    step_bytes = _BYTES_PER_ELEMENT * max(simulations, 1) + _BINCOUNT_BYTES_PER_STEP
+    if sampling == "sobol":
+        step_bytes += _SOBOL_BYTES_PER_ELEMENT * max(simulations, 1) + _SOBOL_BYTES_PER_STEP
+    return max(int(budget // step_bytes), 1)
+
+
+def _band_grid(model, first_step, steps):
+    elapsed = np.arange(first_step + 1, first_step + steps + 1, dtype=float)
+    center = model.drift * elapsed
+    scale = np.maximum(model.volatility * np.sqrt(elapsed), 1e-12)
+    return center, scale
+
+
+def _accumulate_bands(counts, log_values, model, first_step):
+    steps = log_values.shape[0]
+    center, scale = _band_grid(model, first_step, steps)
+    # One float and one index array per element; every other step works in place.
+    position = np.subtract(log_values, center[:, None])
+    position /= scale[:, None]
+    position += BAND_WIDTH
+    position *= BAND_BINS / (2 * BAND_WIDTH)
+    np.clip(position, 0, BAND_BINS - 1, out=position)
+    bins = position.astype(np.int64)
+    del position
+    bins += (np.arange(steps) * BAND_BINS)[:, None]
+    counts += np.bincount(bins.ravel(), minlength=steps * BAND_BINS).reshape(steps, BAND_BINS).astype(counts.dtype)
+
+
+def _read_bands(counts, model, percentiles):
+    steps = counts.shape[0]
+    center, scale = _band_grid(model, 0, steps)
+    cumulative = np.cumsum(counts, axis=1, dtype=np.int64)
+    totals = cumulative[:, -1].astype(float)
+    fractions = np.asarray(percentiles, dtype=float) / 100.0
+
+    # All percentiles in one pass: offsetting each row by more than its total
+    # makes the flattened cumulative counts sorted, so a single searchsorted
+    # finds the bin holding every (step, percentile) target.
+    rows = np.arange(steps)[:, None]
+    row_offset = rows * (int(totals.max(initial=0)) + 1)
+    target = totals[:, None] * fractions[None, :]
+    bins = np.searchsorted((cumulative + row_offset).ravel(), target + row_offset, side="left")
+    bins = np.minimum(bins - rows * BAND_BINS, BAND_BINS - 1)
+
+    below = np.where(bins > 0, cumulative[rows, np.maximum(bins - 1, 0)], 0)
+    inside = np.maximum(counts[rows, bins], 1)
+    fraction = np.clip((target - below) / inside, 0.0, 1.0)
+    position = (bins + fraction) * (2 * BAND_WIDTH / BAND_BINS) - BAND_WIDTH
+    values = center[:, None] + position * scale[:, None]
+    return {percentile: values[:, index] for index, percentile in enumerate(percentiles)}
+
+
+def _shard_sizes(simulations, sampling):
+    if sampling == "sobol":
+        # Each shard is one independently scrambled replicate of the point set.
+        replicates = min(SOBOL_REPLICATES, simulations)
+        return [len(part) for part in np.array_split(np.arange(simulations), replicates)]
+    full, remainder = divmod(simulations, SHARD_PATHS)
+    return [SHARD_PATHS] * full + ([remainder] if remainder else [])
+
+
+def _standard_errors(final_values, sizes, percentiles):
+    # The spread of percentile estimates across independent replicates of the
+    # run measures how stable the pooled estimate is. Sobol shards are the
+    # randomized-QMC replicates themselves; pseudo-random shards are pooled
+    # into as many replicates, so no estimate rests on a 100-path tail.
+    replicates = np.array_split(np.arange(len(sizes)), min(SOBOL_REPLICATES, len(sizes)))
+    if len(replicates) < 2:
+        return {percentile: None for percentile in percentiles}
+    ends = np.cumsum(sizes)
+    splits = np.split(final_values, [ends[group[-1]] for group in replicates[:-1]])
+    estimates = np.array([np.percentile(split, percentiles) for split in splits])
+    errors = estimates.std(axis=0, ddof=1) / np.sqrt(len(splits))
+    return {percentile: float(error) for percentile, error in zip(percentiles, errors)}
+
+
+def _shard_generator(seed_sequence, state):
+    rng = np.random.default_rng(seed_sequence)
+    if state is not None:
+        rng.bit_generator.state = state
+    return rng
+
+
+def _run_shards(model, first_step, steps, shards, log_value, memory_budget_mb, sampling="standard", progress=None):
+    # shards: (seed_sequence, paths, state) triples, where state is the generator
+    # state an earlier run stopped at (None for a new shard). Each shard draws from
+    # its own stream in time order, so results do not depend on how shards are
+    # chunked, grouped or extended later.
+    rngs = [_shard_generator(seed_sequence, state) for seed_sequence, _, state in shards]
+    offsets = np.cumsum([0] + [paths for _, paths, _ in shards])
+    simulations = int(offsets[-1])
+    chunk = _chunk_steps(simulations, memory_budget_mb, sampling, steps)
+    # Chunks start on block boundaries so resampled blocks never depend on chunking.
+    block_length = getattr(model, "block_length", 1)
+    chunk = max(chunk // block_length, 1) * block_length
+
+    log_value = np.array(log_value, dtype=float)
+    counts = np.zeros((steps, BAND_BINS), dtype=np.int32)
+    for offset in range(0, steps, chunk):
+        chunk_steps = min(chunk, steps - offset)
+        log_values = np.empty((chunk_steps, simulations))
+        for rng, start, stop in zip(rngs, offsets[:-1], offsets[1:]):
+            log_values[:, start:stop] = model.draw(rng, chunk_steps, stop - start, sampling)
+        np.cumsum(log_values, axis=0, out=log_values)
+        log_values += log_value
+        log_value = log_values[-1].copy()
+        _accumulate_bands(counts[offset:offset + chunk_steps], log_values, model, first_step + offset)
+        if progress is not None:
+            progress(chunk_steps * simulations)
+    return log_value, counts, [rng.bit_generator.state for rng in rngs]
+
+
+def _run_shard_group(model, first_step, steps, shards, log_value, memory_budget_mb, sampling="standard",
+                     progress=None):
+    if sampling != "sobol":
+        return _run_shards(model, first_step, steps, shards, log_value, memory_budget_mb, sampling, progress)
+
+    # Sobol replicates run one at a time so the budget covers a whole replicate's
+    # horizon, keeping each Brownian bridge in one piece where possible.
+    # Band counts are summed as replicates finish rather than kept per replicate.
+    offsets = np.cumsum([0] + [paths for _, paths, _ in shards])
+    log_values, counts, states = [], None, []
+    for shard, start, stop in zip(shards, offsets[:-1], offsets[1:]):
+        shard_log_value, shard_counts, shard_states = _run_shards(
+            model, first_step, steps, [shard], log_value[start:stop], memory_budget_mb, sampling, progress,
+        )
+        log_values.append(shard_log_value)
+        if counts is None:
+            counts = shard_counts
+        else:
+            counts += shard_counts
+        states.extend(shard_states)
+    return np.concatenate(log_values), counts, states
+
+
+def _advance(model, first_step, steps, shards, log_value, memory_budget_mb, sampling, workers, progress=None):
+    workers = min(workers, len(shards))
+    if workers <= 1:
+        return _run_shard_group(model, first_step, steps, shards, log_value, memory_budget_mb, sampling, progress)
+
+    groups = np.array_split(np.arange(len(shards)), workers)
+    offsets = np.cumsum([0] + [paths for _, paths, _ in shards])
+    tasks = [
+        (
+            model,
+            first_step,
+            steps,
+            [shards[i] for i in group],
+            log_value[offsets[group[0]]:offsets[group[-1] + 1]],
+            memory_budget_mb / workers,
+            sampling,
+        )
+        for group in groups
+    ]
+    runner = _server_runner()
+    if runner is not None:
+        # Each server call blocks until its group is done, so they go out from threads.
+        callers = ThreadPoolExecutor(max_workers=len(tasks))
+        futures = [callers.submit(runner.run, os.getpid(), *task) for task in tasks]
+        callers.shutdown(wait=False)
+    else:
+        pool = _get_pool(workers)
+        futures = [pool.submit(_run_shard_group, *task) for task in tasks]
+    # Worker processes cannot call back into this one; progress moves per group.
+    results = []
+    for group, future in zip(groups, futures):
+        results.append(future.result())
+        if progress is not None:
+            progress(steps * int(offsets[group[-1] + 1] - offsets[group[0]]))
+    return (
+        np.concatenate([group_log_value for group_log_value, _, _ in results]),
+        sum(counts for _, counts, _ in results),
+        [state for _, _, states in results for state in states],
+    )
+
+
+def _get_pool(workers):
+    global _pool, _pool_workers, _cancel_flags
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False, cancel_futures=True)
+            # spawn rather than fork: the dashboard process runs Flask and refresher threads.
+            context = multiprocessing.get_context("spawn")
+            if _cancel_flags is None:
+                _cancel_flags = context.RawArray("b", CANCEL_SLOTS)
+            _pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=context,
+                initializer=_init_worker,
+                initargs=(os.getpid(), _cancel_flags),
+            )
+            _pool_workers = workers
+        return _pool
+
+
+def _init_worker(parent_pid, cancel_flags):
+    global _cancel_flags
+    _cancel_flags = cancel_flags
+    _exit_with_parent(parent_pid)
+
+
+def _stop_if_cancelled(slot, _amount):
+    # Passed to shard groups as their progress callback, so a cancelled group
+    # stops after its current time chunk.
+    if _cancel_flags[slot]:
+        raise SimulationCancelled()
+
+
+def _exit_with_parent(parent_pid):
+    # Pool workers and the simulation server go away with the process that
+    # started them, even when it was killed before it could stop them.
+    def watch():
+        while os.getppid() == parent_pid:
+            time.sleep(1)
+        os._exit(0)
+
+    threading.Thread(target=watch, name="parent-watch", daemon=True).start()
+
+
+# SIMULATION SERVER
+# Background callbacks run in short-lived job processes, so a pool created in
+# one would be started and thrown away with every run. The app starts a server
+# process instead that owns one pool for its lifetime; job processes inherit its
+# address through the environment and send it their shard groups.
+class _ShardRunner:
+    def run(self, owner, *task):
+        pool = _get_pool(WORKERS)
+        slot = _claim_slot(owner)
+        try:
+            stop = None if slot is None else partial(_stop_if_cancelled, slot)
+            return pool.submit(_run_shard_group, *task, stop).result()
+        finally:
+            _release_slot(slot)
+
+    def cancel(self, owner):
+        with _pool_lock:
+            for slot, slot_owner in _slot_owners.items():
+                if slot_owner == owner:
+                    _cancel_flags[slot] = 1
+
+
+def _claim_slot(owner):
+    with _pool_lock:
+        slot = next((slot for slot in range(CANCEL_SLOTS) if slot not in _slot_owners), None)
+        if slot is not None:
+            _slot_owners[slot] = owner
+            _cancel_flags[slot] = 0
+        return slot
+
+
+def _release_slot(slot):
+    with _pool_lock:
+        _slot_owners.pop(slot, None)
+
+
+class _ServerManager(BaseManager):
+    pass
+
+
+_ServerManager.register("ShardRunner", _ShardRunner)
+
+
+def start_simulation_server():
+    global _server
+    # Spawned children re-import the app module, and processes started after
+    # the server (the job fork server, jobs) already have its address.
+    if WORKERS <= 1 or os.getenv(SERVER_ADDRESS_ENV) or multiprocessing.current_process().name != "MainProcess":
+        return None
+
+    with _pool_lock:
+        authkey = os.urandom(16)
+        _server = _ServerManager(address=("127.0.0.1", 0), authkey=authkey, ctx=multiprocessing.get_context("spawn"))
+        _server.start(initializer=_exit_with_parent, initargs=(os.getpid(),))
+        host, port = _server.address
+        os.environ[SERVER_ADDRESS_ENV] = f"{host}:{port}"
+        os.environ[SERVER_AUTHKEY_ENV] = authkey.hex()
+        return _server
+
+
+def cancel_simulations(owner):
+    # Stops the shard groups a job process (by pid) has running on the server;
+    # killing the job alone would leave them to finish in the pool.
+    runner = _server_runner()
+    if runner is not None:
+        runner.cancel(owner)
+
+
+def _server_runner():
+    global _runner, _runner_pid
+    address = os.getenv(SERVER_ADDRESS_ENV)
+    if not address:
+        return None
+
+    with _pool_lock:
+        # Proxies hold sockets, so each process connects on its own.
+        if _runner is None or _runner_pid != os.getpid():
+            host, port = address.rsplit(":", 1)
+            manager = _ServerManager(address=(host, int(port)), authkey=bytes.fromhex(os.environ[SERVER_AUTHKEY_ENV]))
+            manager.connect()
+            _runner = manager.ShardRunner()
+            _runner_pid = os.getpid()
+        return _runner
+
+
+def horizon_steps(years):
+    return max(int(years * TRADING_DAYS_PER_YEAR), 1)
+
+
+class SimulationRun:
+    # Aggregates of a finished run plus the generator state each shard stopped at.
+    # grow() extends every path from its last value to a longer horizon and adds
+    # new shards for extra paths. Shard i always draws from child i of the seed's
+    # spawn tree, in time order, so a grown run matches a fresh run of the larger
+    # size (up to rounding in how the time chunks are summed).
+    def __init__(self, model, seed=42, sampling="standard", memory_budget_mb=None, workers=None):
+        self.model = model
+        self.seed = seed
+        self.sampling = sampling
+        self.memory_budget_mb = MEMORY_BUDGET_MB if memory_budget_mb is None else memory_budget_mb
+        self.workers = WORKERS if workers is None else max(int(workers), 1)
+        self.steps = 0
+        self.sizes = []
+        self.states = []
+        self.log_value = np.zeros(0)
+        self.counts = np.zeros((0, BAND_BINS), dtype=np.int32)
+
+    @property
+    def simulations(self):
+        return int(sum(self.sizes))
+
+    def can_grow(self, steps, simulations):
+        if not self.sizes:
+            return True
+        if steps < self.steps or simulations < self.simulations:
+            return False
+        if self.sampling == "sobol":
+            # Scrambled point sets and Brownian bridges are laid out for one path
+            # count and horizon; only the identical run can be reused.
+            return steps == self.steps and simulations == self.simulations
+        if simulations > self.simulations and self.sizes[-1] != SHARD_PATHS:
+            return False
+        # Bootstrap blocks must keep starting on the same days.
+        return steps == self.steps or self.steps % getattr(self.model, "block_length", 1) == 0
+
+    def _shard_seed(self, index):
+        # Same as SeedSequence(seed).spawn(n)[index] for any n > index.
+        return np.random.SeedSequence(self.seed, spawn_key=(index,))
+
+    def grow(self, steps, simulations, progress=None):
+        # progress, if given, is called as progress(done, total) in path-steps.
+        steps = max(int(steps), 1)
+        simulations = max(int(simulations), 1)
+        if not self.can_grow(steps, simulations):
+            raise ValueError("This run cannot be extended to the requested horizon and path count.")
+
+        report = None
+        if progress is not None:
+            total = (steps - self.steps) * self.simulations + steps * (simulations - self.simulations)
+            done = 0
+
+            def report(amount):
+                nonlocal done
+                done += amount
+                progress(done, total)
+
+        # Grown runs are new objects, so a cached run can be shared between callbacks.
+        run = copy.copy(self)
+        if steps > self.steps and self.sizes:
+            shards = [
+                (self._shard_seed(index), size, state)
+                for index, (size, state) in enumerate(zip(self.sizes, self.states))
+            ]
+            run.log_value, counts, run.states = _advance(
+                self.model, self.steps, steps - self.steps, shards, self.log_value,
+                self.memory_budget_mb, self.sampling, self.workers, report,
+            )
+            run.counts = np.concatenate([self.counts, counts])
+        run.steps = steps
+
+        if simulations > self.simulations:
+            sizes = _shard_sizes(simulations - self.simulations, self.sampling)
+            shards = [
+                (self._shard_seed(len(self.sizes) + index), size, None)
+                for index, size in enumerate(sizes)
+            ]
+            log_value, counts, states = _advance(
+                self.model, 0, steps, shards, np.zeros(sum(sizes)),
+                self.memory_budget_mb, self.sampling, self.workers, report,
+            )
+            run.sizes = self.sizes + sizes
+            run.states = run.states + states
+            run.log_value = np.concatenate([run.log_value, log_value])
+            run.counts = run.counts + counts if self.sizes else counts
+        return run
+
+    def result(self, initial_value, percentiles=PERCENTILES):
+        initial_value = float(initial_value)
+        bands = {
+            percentile: np.concatenate(([initial_value], initial_value * np.exp(band)))
+            for percentile, band in _read_bands(self.counts, self.model, percentiles).items()
+        }
+        final_values = initial_value * np.exp(self.log_value)
+        return {
+            "years_axis": np.arange(self.steps + 1) / TRADING_DAYS_PER_YEAR,
+            "bands": bands,
+            "final_values": final_values,
+            "standard_errors": _standard_errors(final_values, self.sizes, (5, 50, 95)),
+        }
+
+
+def simulate(model, initial_value, years, simulations, seed=42, memory_budget_mb=None,
+             percentiles=PERCENTILES, workers=None, sampling="standard"):
+    # One independent stream per shard of SHARD_PATHS paths from a SeedSequence
+    # spawn tree: a given seed gives the same paths serially or on any pool size.
+    run = SimulationRun(model, seed=seed, sampling=sampling, memory_budget_mb=memory_budget_mb, workers=workers)
+    return run.grow(horizon_steps(years), simulations).result(initial_value, percentiles)
@@ -0,0 +1,146 @@
+import os
+import threading
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from Services.database import connect
+
+
+# PORTFOLIO VALUE SNAPSHOTS
+# Every price refresh writes the per-holding and total market value into a
+# snapshot bucket, and every holding edit records the value it added or removed
+# as a cash flow. Performance history is then one range query over recorded
+# values: it follows the holdings as they really were, not today's weights.
+
+# 0 keeps one bucket per day (the last refresh of the day is its close); a
+# positive value also keeps intraday buckets of that many minutes.
+SNAPSHOT_INTERVAL_MINUTES = int(os.getenv("SNAPSHOT_INTERVAL_MINUTES", "0"))
+
+_lock = threading.Lock()
+_schema_ready = False
+
+
+def _ensure_schema(conn):
+    global _schema_ready
+    if _schema_ready:
+        return
+
+    conn.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS holding_snapshots (
+            taken_at TEXT NOT NULL,
+            ticker TEXT NOT NULL,
+            shares REAL,
+            price REAL,
+            market_value REAL,
+            PRIMARY KEY (taken_at, ticker)
+        ) WITHOUT ROWID;
+
+        CREATE TABLE IF NOT EXISTS portfolio_snapshots (
+            taken_at TEXT PRIMARY KEY,
+            market_value REAL NOT NULL,
+            cash_flow REAL NOT NULL DEFAULT 0,
+            holdings INTEGER,
+            recorded_at TIMESTAMP
+        ) WITHOUT ROWID;
+        """
+    )
+    _schema_ready = True
+
+
+def _bucket(now):
+    if SNAPSHOT_INTERVAL_MINUTES <= 0:
+        return now.strftime("%Y-%m-%d")
+    minutes = (now.hour * 60 + now.minute) // SNAPSHOT_INTERVAL_MINUTES * SNAPSHOT_INTERVAL_MINUTES
+    return f"{now:%Y-%m-%d} {minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def _holdings(conn):
+    return conn.execute(
+        """
+        SELECT UPPER(TRIM(ticker)), SUM(shares), MAX(current_price), SUM(COALESCE(market_value, 0))
+        FROM portfolio
+        WHERE TRIM(COALESCE(ticker, '')) != ''
+        GROUP BY UPPER(TRIM(ticker))
+        """
+    ).fetchall()
+
+
+def portfolio_value():
+    with connect() as conn:
+        return float(sum(row[3] for row in _holdings(conn)))
+
+
+def record_snapshot(value_before=None, now=None, cash_flow=0.0):
+    # value_before is the total just before a holding edit; the difference to
+    # the value after it is money added or withdrawn, not performance.
+    # cash_flow is value that entered the portfolio some other way.
+    now = now or datetime.now()
+    taken_at = _bucket(now)
+    with _lock, connect() as conn:
+        _ensure_schema(conn)
+        holdings = _holdings(conn)
+        total = float(sum(row[3] for row in holdings))
+        cash_flow = float(cash_flow) + (0.0 if value_before is None else total - float(value_before))
+
+        # A bucket is rewritten by each refresh inside it; flows accumulate.
+        previous = conn.execute(
+            "SELECT cash_flow FROM portfolio_snapshots WHERE taken_at = ?", (taken_at,)
+        ).fetchone()
+        if previous is not None:
+            cash_flow += previous[0]
+
+        conn.execute("DELETE FROM holding_snapshots WHERE taken_at = ?", (taken_at,))
+        conn.executemany(
+            "INSERT INTO holding_snapshots (taken_at, ticker, shares, price, market_value) VALUES (?, ?, ?, ?, ?)",
+            [(taken_at, *row) for row in holdings],
+        )
+        conn.execute(
+            """
+            INSERT OR REPLACE INTO portfolio_snapshots (taken_at, market_value, cash_flow, holdings, recorded_at)
+            VALUES (?, ?, ?, ?, ?)
+            """,
+            (taken_at, total, cash_flow, len(holdings), now.isoformat()),
+        )
+    return taken_at
+
+
+def load_value_history(start=None, end=None):
+    # One day per row: the last bucket's value and the day's summed cash flows.
+    start = pd.Timestamp(start or "1970-01-01").strftime("%Y-%m-%d")
+    end = pd.Timestamp(end).strftime("%Y-%m-%d") if end is not None else "9999-12-31"
+    with connect() as conn:
+        _ensure_schema(conn)
+        rows = pd.read_sql(
+            """
+            SELECT taken_at, market_value, cash_flow FROM portfolio_snapshots
+            WHERE taken_at >= ? AND taken_at < ?
+            ORDER BY taken_at
+            """,
+            conn,
+            params=(start, end),
+        )
+    if rows.empty:
+        return pd.DataFrame(columns=["market_value", "cash_flow"], index=pd.DatetimeIndex([], name="date"))
+
+    rows["date"] = pd.to_datetime(rows["taken_at"].str.slice(0, 10))
+    return rows.groupby("date").agg(market_value=("market_value", "last"), cash_flow=("cash_flow", "sum"))
+
+
+def recorded_returns(history, trading_days=None):
+    # Flow-adjusted return between consecutive snapshots, attributed to the
+    # snapshot day; days off the trading calendar roll into the next session.
+    values = history["market_value"].to_numpy(dtype=float)
+    flows = history["cash_flow"].to_numpy(dtype=float)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        returns = pd.Series((values[1:] - flows[1:]) / values[:-1] - 1.0, index=history.index[1:])
+    returns = returns.replace([np.inf, -np.inf], np.nan).dropna()
+    if trading_days is None or returns.empty:
+        return returns
+
+    position = np.asarray(trading_days).searchsorted(returns.index.to_numpy())
+    inside = position < len(trading_days)
+    grouped = np.log1p(returns[inside]).groupby(position[inside]).sum()
+    return pd.Series(np.expm1(grouped.to_numpy()), index=trading_days[grouped.index])
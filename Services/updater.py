@@ -1,60 +1,143 @@
-import yfinance as yf
-import pandas as pd
-from sqlalchemy import create_engine, text
-from datetime import datetime
+import logging
+import os
+
+from sqlalchemy import text
+from datetime import datetime, timedelta
+
+from Services.database import get_engine
+from Services.market_data import download
+from Services.price_store import extract_closes, sync_price_history
+from Services.snapshots import record_snapshot
 
 
 # DATA from YAHOO FINANCE
-# Connect to your existing database
 # KEEP Dashboard Current and LIVE
-engine = create_engine("sqlite:///portfolio.db")
-
-def update_prices():
-    df = pd.read_sql("SELECT * FROM portfolio", engine)
-
-    with engine.begin() as conn:
-        for _, row in df.iterrows():
-            ticker = str(row.get("ticker", "")).strip().upper()
-            if not ticker:
-                continue
-
-            if pd.notna(row["current_price"]) and pd.notna(row["last_updated"]):
-                age = (datetime.now() - pd.to_datetime(row["last_updated"])).total_seconds()
-                if age < 900:
-                    continue
-
-            try:
-                data = yf.Ticker(ticker).history(period="1d")
-            except Exception:
-                continue
-            if data.empty:
-                continue
-
-            price = round(data["Close"].iloc[-1], 2)
-
-            conn.execute(
-                text(
-                    """
-                    UPDATE portfolio
-                    SET
-                        current_price = :price,
-                        market_value = :market_value,
-                        Total_Profit_Loss = :pnl,
-                        last_updated = :last_updated
-                    WHERE ticker = :ticker
-                    """
-                ),
-                {
-                    "price": price,
-                    "market_value": price * row["shares"],
-                    "pnl": (price - row["avg_price"]) * row["shares"],
-                    "last_updated": datetime.now(),
-                    "ticker": ticker,
-                },
-            )
-       
-
- 
+
+STALE_AFTER = timedelta(minutes=15)
+# Symbols per multi-ticker download; Yahoo starts rejecting very long symbol lists.
+BATCH_SIZE = int(os.getenv("PRICE_REFRESH_BATCH_SIZE", "100"))
+# Daily history kept current for the analytics page: every holding plus the
+# benchmark, over its longest lookback.
+HISTORY_PERIOD = os.getenv("PRICE_HISTORY_PERIOD", "3y")
+BENCHMARK_TICKERS = ["SPY"]
+
+logger = logging.getLogger(__name__)
+
+
+def _stale_tickers(conn, now):
+    # datetime() normalizes both the "YYYY-MM-DD HH:MM:SS" and ISO "T" formats
+    # that end up in last_updated.
+    rows = conn.execute(
+        text(
+            """
+            SELECT DISTINCT UPPER(TRIM(ticker)) FROM portfolio
+            WHERE TRIM(COALESCE(ticker, '')) != ''
+              AND (
+                COALESCE(current_price, 0) = 0
+                OR last_updated IS NULL
+                OR datetime(last_updated) IS NULL
+                OR datetime(last_updated) < datetime(:cutoff)
+              )
+            """
+        ),
+        {"cutoff": (now - STALE_AFTER).isoformat(sep=" ")},
+    ).fetchall()
+    return [row[0] for row in rows]
+
+
+def _unpriced_positions(conn):
+    rows = conn.execute(
+        text(
+            """
+            SELECT UPPER(TRIM(ticker)), SUM(shares), SUM(COALESCE(market_value, 0)) FROM portfolio
+            WHERE TRIM(COALESCE(ticker, '')) != '' AND COALESCE(current_price, 0) = 0
+            GROUP BY UPPER(TRIM(ticker))
+            """
+        )
+    ).fetchall()
+    return {row[0]: (row[1] or 0.0, row[2]) for row in rows}
+
+
+def _latest_closes(tickers):
+    try:
+        history = download(
+            tickers,
+            period="5d",
+            interval="1d",
+            progress=False,
+            auto_adjust=True,
+            group_by="column",
+            threads=True,
+        )
+    except Exception:
+        # The batch keeps its old prices and stays stale, so the next refresh retries it.
+        logger.exception("Price download failed for %s", ", ".join(tickers))
+        return {}
+
+    closes = extract_closes(history, tickers)
+    latest = {}
+    for ticker in closes.columns:
+        series = closes[ticker].dropna()
+        if not series.empty:
+            latest[ticker] = round(float(series.iloc[-1]), 2)
+    return latest
+
+
+def update_prices(batch_size=None):
+    batch_size = max(int(batch_size or BATCH_SIZE), 1)
+    now = datetime.now()
+
+    with get_engine().connect() as conn:
+        tickers = _stale_tickers(conn, now)
+    if not tickers:
+        return 0
+
+    prices = {}
+    for start in range(0, len(tickers), batch_size):
+        prices.update(_latest_closes(tickers[start:start + batch_size]))
+    if not prices:
+        return 0
+
+    with get_engine().begin() as conn:
+        # A new holding is valued at its cost until its first price arrives. The
+        # step to its market value is the position coming in at market, not
+        # performance, so it is recorded as a flow.
+        unpriced = _unpriced_positions(conn)
+        first_pricing = sum(
+            price * unpriced[ticker][0] - unpriced[ticker][1]
+            for ticker, price in prices.items()
+            if ticker in unpriced
+        )
+        conn.execute(
+            text(
+                """
+                UPDATE portfolio
+                SET
+                    current_price = :price,
+                    market_value = :price * shares,
+                    Total_Profit_Loss = (:price - avg_price) * shares,
+                    last_updated = :last_updated
+                WHERE ticker = :ticker
+                """
+            ),
+            [
+                {"price": price, "last_updated": now, "ticker": ticker}
+                for ticker, price in prices.items()
+            ],
+        )
+    record_snapshot(now=now, cash_flow=first_pricing)
+    return len(prices)
+
+
+def sync_history(period=None):
+    # Downloads only bars the price store is missing, at most once per
+    # SYNC_INTERVAL per ticker, so pages can read it without going online.
+    with get_engine().connect() as conn:
+        rows = conn.execute(
+            text("SELECT DISTINCT UPPER(TRIM(ticker)) FROM portfolio WHERE TRIM(COALESCE(ticker, '')) != ''")
+        ).fetchall()
+    sync_price_history([row[0] for row in rows] + BENCHMARK_TICKERS, period=period or HISTORY_PERIOD)
+
 
 if __name__ == "__main__":
     print("Fetching new prices from Yahoo Finance...")
@@ -2,10 +2,15 @@ from dash import Dash, html, dcc
 import dash
 from dotenv import load_dotenv
 
-from Services.database import get_engine
-
+# Services read their settings from the environment when imported, so .env has
+# to be loaded first.
 load_dotenv()
 
+from Services.database import get_engine
+from Services import background, market_data
+from Services.refresher import start_price_refresher
+from Services.simulation import start_simulation_server
+
 
 engine = get_engine()
 
@@ -14,6 +19,7 @@ app = Dash(
     use_pages=True,
     suppress_callback_exceptions=True,
     title="Apothicaire Portfolio",
+    background_callback_manager=background.manager,
 )
 
 app.layout = html.Div([
@@ -29,3 +35,13 @@ app.layout = html.Div([
 ])
 
 server = app.server
+
+
+@server.route("/api/market-data/stats")
+def market_data_stats():
+    # Request, download and coalesced-download counters for this process.
+    return market_data.stats()
+
+
+start_price_refresher()
+start_simulation_server()
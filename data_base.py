@@ -1,11 +1,10 @@
 
 # DATABASE CREATION SCRIPT
 
-import sqlite3
-conn = sqlite3.connect('portfolio.db')
-with open('schema.sql', 'r') as f:
+from Services.database import connect
+
+with open('schema.sql', 'r') as f, connect() as conn:
     conn.executescript(f.read())
-conn.close()
 
 
 
@@ -1,17 +1,22 @@
 
+import logging
+
 import dash
 from dash import Input, Output, html
-from dash import dcc
+from dash import dcc, dash_table
+from dash.dash_table.Format import Format, Scheme
 import numpy as np
 import pandas as pd
-import yfinance as yf
 import plotly.express as px
+from plotly.subplots import make_subplots
 
 from pages.covariance import _metric_card
-from Services.helper import load_data
-
-print("analytics module loaded")
+from Services.holdings import load_holdings
+from Services.price_store import load_price_history, sync_price_history
+from Services.snapshots import load_value_history, recorded_returns
+from Services.rolling import rolling_beta, rolling_max_drawdown, rolling_mean, rolling_volatility
 
+logger = logging.getLogger(__name__)
 
 
 
@@ -24,27 +29,72 @@ dash.register_page(
 )
 
 TRADING_DAYS=252
+RISK_FREE_RATE = 0.04
+PORTFOLIO_LABEL = "Portfolio"
+ANALYTICS_PERIOD = "1y"
+# Rolling metrics use a longer history so the 1-year window has a series to plot.
+ROLLING_PERIOD = "3y"
+ROLLING_WINDOWS = (63, 126, 252)
+DEFAULT_ROLLING_WINDOW = 126
+ROLLING_METRICS = (
+    ("sharpe", "Sharpe", ".2f"),
+    ("sortino", "Sortino", ".2f"),
+    ("beta", "Beta", ".2f"),
+    ("alpha", "Alpha", ".0%"),
+    ("max_drawdown", "Max Drawdown", ".0%"),
+)
 
 #calculate returns
 def compute_returns(prices):
-    return prices.pct_change().dropna()
+    return prices.ffill().pct_change(fill_method=None).dropna()
 
 def compute_portfolio_returns(returns,weights):
-    return (returns*weights).sum(axis=1)
+    if not returns.isna().values.any():
+        return (returns*weights).sum(axis=1)
+    # Spread each day's weight over the holdings that traded that day.
+    weights = weights.reindex(returns.columns).fillna(0)
+    covered = returns.notna().mul(weights, axis=1).sum(axis=1)
+    return (returns*weights).sum(axis=1) / covered.where(covered > 0)
+
+#regress every column on the benchmark at once
+def compute_regression_stats(returns, benchmark_returns, rf=RISK_FREE_RATE):
+    # Closed-form OLS of each column's excess return on the benchmark's: one
+    # pass over the (days x columns) matrix instead of a polyfit per column.
+    rf_daily = rf / TRADING_DAYS
+    excess = returns.to_numpy(dtype=float) - rf_daily
+    excess_m = benchmark_returns.to_numpy(dtype=float) - rf_daily
+
+    centered = excess - excess.mean(axis=0)
+    centered_m = excess_m - excess_m.mean()
+    var_m = centered_m @ centered_m
+    ss_total = (centered * centered).sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        beta = centered_m @ centered / var_m
+        alpha_daily = excess.mean(axis=0) - beta * excess_m.mean()
+        r_squared = beta * beta * var_m / ss_total
+
+    active = returns.to_numpy(dtype=float) - benchmark_returns.to_numpy(dtype=float)[:, None]
+    tracking_error = active.std(axis=0, ddof=1) * np.sqrt(TRADING_DAYS)
+
+    return pd.DataFrame(
+        {
+            "beta": beta,
+            "alpha": alpha_daily * TRADING_DAYS,
+            "r_squared": r_squared,
+            "tracking_error": tracking_error,
+        },
+        index=returns.columns,
+    )
 
 #calculate main metrics
 def compute_performance_metrics(portfolio_returns , benchmark_returns):
 
-    rf = 0.04
-    rf_daily = rf / TRADING_DAYS
-    excess_p = portfolio_returns - rf_daily
-    excess_m = benchmark_returns - rf_daily
-    
+    rf = RISK_FREE_RATE
+
     # Regression for beta and alpha
-    slope, intercept = np.polyfit(excess_m, excess_p, 1)
-    beta = slope
-    alpha_daily = intercept
-    alpha = alpha_daily * TRADING_DAYS
+    regression = compute_regression_stats(portfolio_returns.to_frame(PORTFOLIO_LABEL), benchmark_returns, rf).iloc[0]
+    beta = regression["beta"]
+    alpha = regression["alpha"]
 
     mean_return = portfolio_returns.mean() * TRADING_DAYS
     volatility = portfolio_returns.std() * np.sqrt(TRADING_DAYS)
@@ -63,6 +113,61 @@ def compute_performance_metrics(portfolio_returns , benchmark_returns):
     return {"sharpe": sharpe_ratio, "sortino": sortino, "beta": beta, "alpha": alpha, "max_drawdown": max_drawdown}
 
 
+#rolling versions of the main metrics
+def compute_rolling_metrics(portfolio_returns, benchmark_returns, window, rf=RISK_FREE_RATE):
+    # Same definitions as compute_performance_metrics over each trailing
+    # window; every statistic comes from cumulative sums in one pass.
+    values = portfolio_returns.to_numpy(dtype=float)
+    mean_return = rolling_mean(values, window) * TRADING_DAYS
+    volatility = rolling_volatility(values, window) * np.sqrt(TRADING_DAYS)
+    # Downside deviation of the losing days only, as in the full-window Sortino.
+    downside = np.where(values < 0, values, np.nan)
+    downside_std = rolling_volatility(downside, window, min_periods=2) * np.sqrt(TRADING_DAYS)
+
+    rf_daily = rf / TRADING_DAYS
+    beta, alpha_daily = rolling_beta(
+        (values - rf_daily)[:, None], benchmark_returns.to_numpy(dtype=float) - rf_daily, window
+    )
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        sharpe = (mean_return - rf) / volatility
+        sortino = (mean_return - rf) / downside_std
+    metrics = pd.DataFrame(
+        {
+            "sharpe": sharpe,
+            "sortino": sortino,
+            "beta": beta[:, 0],
+            "alpha": alpha_daily[:, 0] * TRADING_DAYS,
+            "max_drawdown": rolling_max_drawdown(values, window),
+        },
+        index=portfolio_returns.index,
+    )
+    # Windows that are not full yet (downside_std only needs two losing days).
+    metrics.iloc[: window - 1] = np.nan
+    return metrics.replace([np.inf, -np.inf], np.nan)
+
+
+def build_rolling_figure(metrics, window):
+    fig = make_subplots(
+        rows=len(ROLLING_METRICS),
+        cols=1,
+        shared_xaxes=True,
+        vertical_spacing=0.03,
+        subplot_titles=[label for _, label, _ in ROLLING_METRICS],
+    )
+    metrics = metrics.dropna(how="all")
+    for row, (column, label, tick_format) in enumerate(ROLLING_METRICS, start=1):
+        fig.add_scatter(x=metrics.index, y=metrics[column], mode="lines", name=label, row=row, col=1)
+        fig.update_yaxes(tickformat=tick_format, row=row, col=1)
+    fig.update_layout(
+        title=f"Rolling {window}-Day Metrics",
+        height=180 * len(ROLLING_METRICS),
+        showlegend=False,
+        template="plotly_white",
+    )
+    return fig
+
+
 #Portfolio vs SPY
 
 def _extract_adj_close(data, tickers):
@@ -92,39 +197,108 @@ def _extract_adj_close(data, tickers):
 
 
 def get_historical_prices(tickers, period="6mo", interval="1d"):
-    all_prices = {}
-    for ticker in tickers:
-        try:
-            data = yf.download(
-                ticker,
-                period=period,
-                interval=interval,
-                progress=False,
-                threads=False,
-                auto_adjust=True,
-            )
-            if not data.empty:
-                if isinstance(data.columns, pd.MultiIndex):
-                    if "Close" in data.columns.get_level_values(0):
-                        adj_close = data["Close"].iloc[:, 0]
-                    else:
-                        continue
-                else:
-                    if "Adj Close" in data.columns:
-                        adj_close = data["Adj Close"]
-                    elif "Close" in data.columns:
-                        adj_close = data["Close"]
-                    else:
-                        continue
-                if not adj_close.empty:
-                    all_prices[ticker] = adj_close
-        except Exception as e:
-            print(f"[analytics] Failed to download {ticker}: {e}")
-            continue
-    if not all_prices:
-        return pd.DataFrame()
-    df = pd.DataFrame(all_prices)
-    return df
+    # Daily bars come from the local price store, which the price refresher
+    # keeps current; only tickers it has not stored yet are downloaded here.
+    if interval != "1d":
+        raise ValueError("Only daily price history is stored locally.")
+    prices = load_price_history(tickers, period=period, sync=False)
+    missing = [ticker for ticker in tickers if ticker not in prices.columns]
+    if missing:
+        sync_price_history(missing, period=period)
+        prices = load_price_history(tickers, period=period, sync=False)
+    return prices
+
+#Portfolio and benchmark returns over a lookback period
+def load_portfolio_returns(period="1y", drop_incomplete=True):
+    # Get portfolio data
+    df = load_holdings()
+    if df.empty:
+        return None
+    
+    # Price history is fetched concurrently per ticker, so the whole portfolio is covered
+    df_sorted = df.sort_values(by="market_value", ascending=False)
+    tickers = df_sorted["ticker"].tolist()
+
+    market_values = pd.to_numeric(df_sorted["market_value"], errors="coerce").fillna(0)
+    if market_values.sum() <= 0:
+        return None
+
+    weights = market_values / market_values.sum()
+
+    # Get historical prices
+    try:
+        prices = get_historical_prices(tickers, period=period, interval="1d")
+    except Exception as e:
+        logger.warning("Price history unavailable for %s: %s", ", ".join(tickers), e)
+        prices = pd.DataFrame()
+
+    if prices.empty:
+        logger.debug("No price history for the portfolio")
+        return None
+
+    # Remove tickers without data
+    prices = prices.dropna(axis=1, how="all")
+    if prices.empty:
+        logger.debug("No price history for any holding")
+        return None
+
+    # Drop tickers with any missing data to avoid NaN in returns. Long
+    # lookbacks keep younger listings instead; see compute_portfolio_returns.
+    prices = prices.dropna(axis=1) if drop_incomplete else prices.ffill()
+    if prices.empty:
+        logger.debug("Every holding has gaps in its price history")
+        return None
+
+    # Update tickers and weights to only include those with complete data
+    available_tickers = prices.columns.tolist()
+    df_sorted = df_sorted[df_sorted['ticker'].isin(available_tickers)]
+    market_values = pd.to_numeric(df_sorted["market_value"], errors="coerce").fillna(0)
+    if market_values.sum() <= 0:
+        return None
+    weights = pd.Series(market_values.values / market_values.sum(), index=df_sorted['ticker'])
+
+    returns = prices.ffill().pct_change(fill_method=None).iloc[1:].dropna(how="all")
+    if returns.empty:
+        logger.debug("No returns in the lookback")
+        return None
+
+    # Benchmark SPY
+    try:
+        spy_prices = get_historical_prices(["SPY"], period=period, interval="1d")
+    except Exception:
+        spy_prices = pd.DataFrame()
+    spy = spy_prices["SPY"].dropna() if "SPY" in spy_prices.columns else pd.Series(dtype=float)
+    spy_returns = spy.pct_change(fill_method=None).dropna()
+    
+    # Align dates
+    common_index = returns.index.intersection(spy_returns.index)
+    returns = returns.loc[common_index]
+    spy_returns = spy_returns.loc[common_index]
+
+    if len(common_index) < 2 or returns.empty or spy_returns.empty:
+        logger.debug("Only %d days shared with the benchmark", len(common_index))
+        return None
+
+    portfolio_returns = splice_recorded_returns(compute_portfolio_returns(returns, weights), spy_returns.index)
+    return returns, weights, portfolio_returns, spy_returns
+
+
+def splice_recorded_returns(portfolio_returns, trading_days):
+    # Days covered by value snapshots use the recorded, flow-adjusted returns
+    # of the holdings actually held; days before (or after, if the refresher
+    # was not running) keep the reconstruction from today's weights.
+    history = load_value_history(start=trading_days.min())
+    recorded = recorded_returns(history, trading_days)
+    if recorded.empty:
+        return portfolio_returns
+
+    covered = trading_days[(trading_days >= recorded.index[0]) & (trading_days <= recorded.index[-1])]
+    # A session without a snapshot has its move in the next recorded day.
+    return pd.concat([
+        portfolio_returns[portfolio_returns.index < recorded.index[0]],
+        recorded.reindex(covered, fill_value=0.0),
+        portfolio_returns[portfolio_returns.index > recorded.index[-1]],
+    ])
 
 #Layout
 
@@ -143,7 +317,39 @@ layout = html.Div([
     ], style={"display": "flex", "gap": "10px"}),
 
     dcc.Graph(id="performance_chart"),
-    dcc.Graph(id="drawdown_chart")
+    dcc.Graph(id="drawdown_chart"),
+
+    html.Div([
+        html.Label("Rolling window"),
+        dcc.Dropdown(
+            id="rolling_window",
+            options=[{"label": f"{days} days", "value": days} for days in ROLLING_WINDOWS],
+            value=DEFAULT_ROLLING_WINDOW,
+            clearable=False,
+            style={"width": "200px"},
+        ),
+    ]),
+    dcc.Graph(id="rolling_metrics_chart"),
+
+    html.H3("Holdings vs SPY"),
+    dash_table.DataTable(
+        id="regression_table",
+        columns=[
+            {"name": "Ticker", "id": "ticker", "type": "text"},
+            {"name": "Weight", "id": "weight", "type": "numeric", "format": Format(precision=2, scheme=Scheme.percentage)},
+            {"name": "Beta", "id": "beta", "type": "numeric", "format": Format(precision=2, scheme=Scheme.fixed)},
+            {"name": "Alpha (ann.)", "id": "alpha", "type": "numeric", "format": Format(precision=2, scheme=Scheme.percentage)},
+            {"name": "R²", "id": "r_squared", "type": "numeric", "format": Format(precision=2, scheme=Scheme.fixed)},
+            {"name": "Tracking Error", "id": "tracking_error", "type": "numeric", "format": Format(precision=2, scheme=Scheme.percentage)},
+        ],
+        data=[],
+        sort_action="native",
+        page_size=25,
+        style_data_conditional=[{"if": {"filter_query": f"{{ticker}} = '{PORTFOLIO_LABEL}'"},
+                                    "fontWeight": "bold",
+                                    "backgroundColor": "#f7f8fc"}],
+        style_header={"fontWeight": "bold"},
+    )
 
 ])
 
@@ -161,128 +367,32 @@ if not hasattr(dash, '_analytics_callback_registered'):
         Output("beta","children"), 
         Output("alpha","children"), 
         Output("max_drawdown","children"),
+        Output("regression_table","data"),
         Input('analytics_location', 'pathname')
     )
     def update_analytics(pathname):
-        print("[analytics] callback triggered")
-        # Get portfolio data
-        df = load_data()
-        print(f"[analytics] portfolio df shape: {df.shape}")
-        if not df.empty:
-            print(f"[analytics] portfolio df head: {df.head()}")
-        if df.empty:
-            # Return empty figures and N/A
+        inputs = load_portfolio_returns(ANALYTICS_PERIOD)
+        if inputs is None:
             empty_fig = px.line()
-            return empty_fig, empty_fig, "N/A", "N/A", "N/A", "N/A", "N/A"
-        
-        # Limit to top 5 tickers by market value to keep data fetch fast
-        df_sorted = df.sort_values(by="market_value", ascending=False).head(5)
-        tickers = df_sorted["ticker"].tolist()
-
-        market_values = pd.to_numeric(df_sorted["market_value"], errors="coerce").fillna(0)
-        if market_values.sum() <= 0:
-            empty_fig = px.line()
-            return empty_fig, empty_fig, "N/A", "N/A", "N/A", "N/A", "N/A"
-
-        weights = market_values / market_values.sum()
-
-        # Get historical prices
-        try:
-            prices = get_historical_prices(tickers, period="1y", interval="1d")
-        except Exception as e:
-            print(f"[analytics] price download error: {e}")
-            prices = pd.DataFrame()
-
-        print(f"[analytics] tickers: {tickers}")
-        print(f"[analytics] weights: {weights.values}")
-        print(f"[analytics] prices shape: {prices.shape}, columns: {prices.columns.tolist() if not prices.empty else 'empty'}")
-
-        if prices.empty:
-            print("[analytics] prices empty after download")
-            empty_fig = px.line()
-            return empty_fig, empty_fig, "N/A", "N/A", "N/A", "N/A", "N/A"
-
-        # Remove tickers without data
-        prices = prices.dropna(axis=1, how="all")
-        if prices.empty:
-            print("[analytics] all tickers dropped; no price columns")
-            empty_fig = px.line()
-            return empty_fig, empty_fig, "N/A", "N/A", "N/A", "N/A", "N/A"
-
-        # Drop tickers with any missing data to avoid NaN in returns
-        prices = prices.dropna(axis=1)
-        print(f"[analytics] after dropna any: prices shape: {prices.shape}, columns: {prices.columns.tolist() if not prices.empty else 'empty'}")
-        if prices.empty:
-            print("[analytics] all tickers have missing data; no complete price columns")
-            empty_fig = px.line()
-            return empty_fig, empty_fig, "N/A", "N/A", "N/A", "N/A", "N/A"
-
-        # Update tickers and weights to only include those with complete data
-        available_tickers = prices.columns.tolist()
-        df_sorted = df_sorted[df_sorted['ticker'].isin(available_tickers)]
-        market_values = pd.to_numeric(df_sorted["market_value"], errors="coerce").fillna(0)
-        if market_values.sum() <= 0:
-            empty_fig = px.line()
-            return empty_fig, empty_fig, "N/A", "N/A", "N/A", "N/A", "N/A"
-        weights = pd.Series(market_values.values / market_values.sum(), index=df_sorted['ticker'])
-
-        returns = compute_returns(prices)
-        print(f"[analytics] returns shape: {returns.shape}, columns: {returns.columns.tolist() if not returns.empty else 'empty'}")
-        if returns.empty:
-            print("[analytics] returns empty after pct_change")
-            empty_fig = px.line()
-            return empty_fig, empty_fig, "N/A", "N/A", "N/A", "N/A", "N/A"
-
-        if prices.empty:
-            empty_fig = px.line()
-            return empty_fig, empty_fig, "N/A", "N/A", "N/A", "N/A", "N/A"
-
-        returns = compute_returns(prices)
-
-        # Benchmark SPY
-        try:
-            spy_raw = yf.download(
-                "SPY",
-                period="1y",
-                interval="1d",
-                progress=False,
-                threads=False,
-                auto_adjust=True,
-            )
-            if not spy_raw.empty:
-                if isinstance(spy_raw.columns, pd.MultiIndex):
-                    if "Close" in spy_raw.columns.get_level_values(0):
-                        spy = spy_raw["Close"].iloc[:, 0]
-                    else:
-                        spy = pd.Series(dtype=float)
-                else:
-                    spy = spy_raw["Adj Close"] if "Adj Close" in spy_raw.columns else spy_raw["Close"] if "Close" in spy_raw.columns else pd.Series(dtype=float)
-            else:
-                spy = pd.Series(dtype=float)
-        except Exception:
-            spy = pd.Series(dtype=float)
-        spy_returns = spy.pct_change().dropna()
-        
-        # Align dates
-        common_index = returns.index.intersection(spy_returns.index)
-        returns = returns.loc[common_index]
-        spy_returns = spy_returns.loc[common_index]
-
-        if len(common_index) < 2 or returns.empty or spy_returns.empty:
-            print(f"[analytics] insufficient data after alignment: common_index={len(common_index)}, returns_cols={returns.shape}, spy={spy_returns.shape}")
-            empty_fig = px.line()
-            return empty_fig, empty_fig, "N/A", "N/A", "N/A", "N/A", "N/A"
-
-        portfolio_returns = compute_portfolio_returns(returns, weights)
-        print(f"[analytics] portfolio_returns sample: {portfolio_returns.head()}")
+            return empty_fig, empty_fig, "N/A", "N/A", "N/A", "N/A", "N/A", []
+        returns, weights, portfolio_returns, spy_returns = inputs
+        returns = returns.loc[portfolio_returns.index]
+        spy_returns = spy_returns.loc[portfolio_returns.index]
         
         metrics = compute_performance_metrics(portfolio_returns, spy_returns)
-        print(f"[analytics] metrics: {metrics}")
+
+        # Per-holding regression table, portfolio first
+        regression = compute_regression_stats(
+            pd.concat([portfolio_returns.rename(PORTFOLIO_LABEL), returns], axis=1),
+            spy_returns,
+        )
+        regression.insert(0, "weight", pd.concat([pd.Series({PORTFOLIO_LABEL: 1.0}), weights]))
+        regression = regression.replace([np.inf, -np.inf], np.nan).astype(object).where(regression.notna(), None)
+        regression_rows = regression.rename_axis("ticker").reset_index().to_dict("records")
         
         # Cumulative Performance
         portfolio_cum = (1 + portfolio_returns).cumprod()
         spy_cum = (1 + spy_returns).cumprod()
-        print(f"[analytics] final portfolio cum: {portfolio_cum.iloc[-1]:.4f}, spy cum: {spy_cum.iloc[-1]:.4f}")
         
         df_perf = pd.DataFrame({
             "Portfolio": portfolio_cum,
@@ -315,4 +425,20 @@ if not hasattr(dash, '_analytics_callback_registered'):
             format_metric(metrics['beta']),
             format_metric(metrics['alpha'], percent=True),
             format_metric(metrics['max_drawdown'], percent=True),
-        )
\ No newline at end of file
+            regression_rows,
+        )
+
+    @dash.callback(
+        Output("rolling_metrics_chart","figure"),
+        Input('analytics_location', 'pathname'),
+        Input("rolling_window","value"),
+    )
+    def update_rolling_metrics(pathname, window):
+        window = int(window or DEFAULT_ROLLING_WINDOW)
+        inputs = load_portfolio_returns(ROLLING_PERIOD, drop_incomplete=False)
+        if inputs is None:
+            return px.line()
+        _, _, portfolio_returns, spy_returns = inputs
+        spy_returns = spy_returns.loc[portfolio_returns.index]
+        metrics = compute_rolling_metrics(portfolio_returns, spy_returns, window)
+        return build_rolling_figure(metrics, window)
@@ -1,17 +1,45 @@
-import sqlite3
-
 import dash
 from dash import Input, Output, dcc, html
 import numpy as np
 import pandas as pd
 import plotly.express as px
-import yfinance as yf
+import plotly.graph_objects as go
+from scipy.cluster.hierarchy import fcluster, leaves_list, linkage
+from scipy.spatial.distance import squareform
+
+from Services.cache import LRUCache, fingerprint
+from Services.covariance_store import load_covariance
+from Services.holdings import load_holdings
+from Services.price_store import load_price_history
+from Services.risk_models import EWMA_DECAY, FactorCovariance
+from Services.rolling import rolling_correlation, rolling_volatility
 
 
-DB_PATH = "portfolio.db"
 LOOKBACK_PERIOD = "6mo"
-LOOKBACK_INTERVAL = "1d"
 TRADING_DAYS_PER_YEAR = 252
+FACTOR_MODEL_MIN_TICKERS = 100
+# Pair insights: the strongest pairs at or above this quantile of |correlation|.
+# From INSIGHT_QUANTILE_MIN_PAIRS pairs on, at least INSIGHT_PAIRS pairs reach
+# the quantile, so it only needs computing for small matrices.
+INSIGHT_PAIRS = 5
+INSIGHT_QUANTILE = 0.8
+INSIGHT_QUANTILE_MIN_PAIRS = 21
+# Larger portfolios are shown as average correlations between at most
+# HEATMAP_MAX_CLUSTERS clusters, and one cluster can be opened at a time, so the
+# heatmap never carries more than HEATMAP_MAX_TICKERS^2 cells.
+HEATMAP_MAX_TICKERS = 60
+HEATMAP_MAX_CLUSTERS = 30
+ALL_CLUSTERS = "all"
+CLUSTER_OPTIONS_ALL = [{"label": "All clusters", "value": ALL_CLUSTERS}]
+# Rolling correlation / volatility chart: history length, window choices and
+# how many of the largest holdings get their own line.
+ROLLING_PERIOD = "2y"
+ROLLING_WINDOWS = (20, 60, 120)
+DEFAULT_ROLLING_WINDOW = 60
+ROLLING_MAX_HOLDINGS = 10
+ROLLING_CACHE_SIZE = 16
+
+_rolling_cache = LRUCache(maxsize=ROLLING_CACHE_SIZE)
 
 
 dash.register_page(
@@ -43,6 +71,56 @@ layout = html.Div(
     [
         dcc.Location(id='cov_location'),
         html.H2("Portfolio Correlation Matrix", className="subtitle"),
+        html.Div(
+            [
+                html.Label("Risk model"),
+                dcc.Dropdown(
+                    id="covariance-risk-model",
+                    options=[
+                        {"label": "Auto", "value": "auto"},
+                        {"label": "Sample covariance", "value": "sample"},
+                        {"label": "EWMA covariance", "value": "ewma"},
+                        {"label": "Shrinkage (Ledoit-Wolf)", "value": "shrinkage"},
+                        {"label": "Factor model (PCA)", "value": "factor"},
+                    ],
+                    value="auto",
+                    clearable=False,
+                ),
+            ],
+            style={"maxWidth": "260px", "marginBottom": "12px"},
+        ),
+        html.Div(
+            [
+                html.Div(
+                    [
+                        html.Label("Heatmap order"),
+                        dcc.Dropdown(
+                            id="covariance-heatmap-order",
+                            options=[
+                                {"label": "Clustered", "value": "cluster"},
+                                {"label": "Alphabetical", "value": "alphabetical"},
+                            ],
+                            value="cluster",
+                            clearable=False,
+                        ),
+                    ],
+                    style={"minWidth": "200px"},
+                ),
+                html.Div(
+                    [
+                        html.Label("Cluster"),
+                        dcc.Dropdown(
+                            id="covariance-cluster",
+                            options=CLUSTER_OPTIONS_ALL,
+                            value=ALL_CLUSTERS,
+                            clearable=False,
+                        ),
+                    ],
+                    style={"minWidth": "260px"},
+                ),
+            ],
+            style={"display": "flex", "gap": "12px", "flexWrap": "wrap", "marginBottom": "12px"},
+        ),
         html.Div(
             [
                 _metric_card("Portfolio Annualized Volatility", "covariance-metric-portfolio-vol"),
@@ -54,6 +132,41 @@ layout = html.Div(
         html.Div(id="covariance-status", style={"marginBottom": "12px"}),
         dcc.Graph(id="covariance-heatmap"),
         html.Div(id="covariance-insights", style={"marginTop": "12px"}),
+        html.H3("Rolling Correlation and Volatility", style={"marginTop": "24px"}),
+        html.Div(
+            [
+                html.Div(
+                    [
+                        html.Label("Window"),
+                        dcc.Dropdown(
+                            id="covariance-rolling-window",
+                            options=[{"label": f"{days} days", "value": days} for days in ROLLING_WINDOWS],
+                            value=DEFAULT_ROLLING_WINDOW,
+                            clearable=False,
+                        ),
+                    ],
+                    style={"minWidth": "160px"},
+                ),
+                html.Div(
+                    [
+                        html.Label("Show"),
+                        dcc.Dropdown(
+                            id="covariance-rolling-metric",
+                            options=[
+                                {"label": "Correlation with portfolio", "value": "portfolio"},
+                                {"label": "Correlation with SPY", "value": "spy"},
+                                {"label": "Annualized volatility", "value": "volatility"},
+                            ],
+                            value="portfolio",
+                            clearable=False,
+                        ),
+                    ],
+                    style={"minWidth": "240px"},
+                ),
+            ],
+            style={"display": "flex", "gap": "12px", "flexWrap": "wrap", "marginBottom": "12px"},
+        ),
+        dcc.Graph(id="covariance-rolling-chart"),
     ]
 )
 
@@ -84,51 +197,6 @@ def _default_metrics():
     return "--", "--", "--"
 
 
-def _load_holdings():
-    with sqlite3.connect(DB_PATH) as conn:
-        df = pd.read_sql(
-            "SELECT ticker, market_value, shares, current_price FROM portfolio",
-            conn,
-        )
-
-    if df.empty:
-        return df
-
-    df["ticker"] = df["ticker"].astype(str).str.strip().str.upper()
-    df = df[df["ticker"] != ""]
-    return df
-
-
-def _extract_prices(data, symbols):
-    if data is None or data.empty:
-        return pd.DataFrame()
-
-    if isinstance(data.columns, pd.MultiIndex):
-        level0 = set(data.columns.get_level_values(0))
-        if "Adj Close" in level0:
-            prices = data["Adj Close"]
-        elif "Close" in level0:
-            prices = data["Close"]
-        else:
-            return pd.DataFrame()
-
-        if isinstance(prices, pd.Series):
-            prices = prices.to_frame()
-
-        prices.columns = [str(col).upper().strip() for col in prices.columns]
-        return prices
-
-    if "Adj Close" in data.columns:
-        series = data["Adj Close"]
-    elif "Close" in data.columns:
-        series = data["Close"]
-    else:
-        return pd.DataFrame()
-
-    column_name = symbols[0].upper().strip() if symbols else "PRICE"
-    return series.to_frame(name=column_name)
-
-
 def _format_metric_texts(portfolio_vol_ann, spy_vol_ann, diversification_ratio):
     portfolio_text = "--" if portfolio_vol_ann is None else f"{portfolio_vol_ann * 100:.2f}%"
 
@@ -150,15 +218,7 @@ def _build_weight_series(holdings, valid_tickers):
     if not valid_tickers:
         return pd.Series(dtype=float)
 
-    market_value = pd.to_numeric(holdings["market_value"], errors="coerce")
-    shares = pd.to_numeric(holdings["shares"], errors="coerce")
-    current_price = pd.to_numeric(holdings["current_price"], errors="coerce")
-
-    fallback_value = shares * current_price
-    position_value = market_value.where(market_value > 0, fallback_value)
-    position_value = position_value.where(position_value > 0, 0.0).fillna(0.0)
-
-    by_ticker = pd.Series(position_value.values, index=holdings["ticker"]).groupby(level=0).sum()
+    by_ticker = holdings.groupby("ticker")["position_value"].sum()
     selected = by_ticker.reindex(valid_tickers).fillna(0.0)
 
     total_value = float(selected.sum())
@@ -169,6 +229,36 @@ def _build_weight_series(holdings, valid_tickers):
     return pd.Series(np.full(len(valid_tickers), equal_weight), index=valid_tickers)
 
 
+def _resolve_risk_model(risk_model, tickers, observations):
+    if risk_model in ("sample", "ewma", "shrinkage", "factor"):
+        return risk_model
+    # The sample covariance is rank-deficient once tickers approach the number of days.
+    if tickers > FACTOR_MODEL_MIN_TICKERS or tickers * 2 >= observations:
+        return "factor"
+    return "sample"
+
+
+def _portfolio_risk(estimator, columns, weight_vec, risk_model):
+    # Daily portfolio sigma and per-asset sigmas under the chosen covariance
+    # model, for the estimator's tickers at positions `columns`.
+    if risk_model == "factor":
+        model = FactorCovariance(estimator.returns()[:, columns])
+        variance_daily = model.portfolio_variance(weight_vec)
+        asset_vols = np.sqrt(model.asset_variances())
+        label = f"Risk model: {model.factors}-factor PCA ({model.explained:.0%} of variance)."
+    else:
+        cov_values = np.nan_to_num(estimator.covariance(risk_model)[np.ix_(columns, columns)], nan=0.0)
+        variance_daily = float(weight_vec.T @ cov_values @ weight_vec)
+        asset_vols = np.sqrt(np.clip(np.diag(cov_values), 0.0, None))
+        if risk_model == "ewma":
+            label = f"Risk model: EWMA covariance (decay {EWMA_DECAY:g})."
+        elif risk_model == "shrinkage":
+            label = f"Risk model: Ledoit-Wolf shrinkage ({estimator.shrinkage_intensity():.0%} towards identity)."
+        else:
+            label = "Risk model: sample covariance."
+    return float(np.sqrt(max(variance_daily, 0.0))), asset_vols, label
+
+
 def _empty_insights(message):
     return html.Div(
         [
@@ -184,41 +274,58 @@ def _empty_insights(message):
     )
 
 
+def _select_insight_pairs(values):
+    # (left, right, correlation) arrays for the up to INSIGHT_PAIRS strongest
+    # |correlation| pairs at or above the INSIGHT_QUANTILE of |correlation|,
+    # strongest first, ties in upper-triangle order.
+    strength = np.abs(values)
+    np.fill_diagonal(strength, np.nan)
+    finite = ~np.isnan(strength)
+    available = int(np.count_nonzero(finite)) // 2
+    if available == 0:
+        left, right = np.triu_indices(values.shape[0], k=1)
+        left, right = left[:3], right[:3]
+        return left, right, values[left, right]
+
+    count = min(INSIGHT_PAIRS, available)
+    if available < INSIGHT_QUANTILE_MIN_PAIRS:
+        # Only small matrices can have fewer than INSIGHT_PAIRS pairs above the quantile.
+        left, right = np.nonzero(np.triu(finite, k=1))
+        cutoff = float(np.quantile(strength[left, right], INSIGHT_QUANTILE))
+    else:
+        # Each pair is the strongest of at most two rows, so the 2 * count
+        # strongest row maxima cover at least count pairs: nothing weaker than
+        # them can make the top count. With fewer rows than that, rank them all.
+        row_best = np.fmax.reduce(strength, axis=1)
+        row_best = row_best[~np.isnan(row_best)]
+        if row_best.size < 2 * count:
+            left, right = np.nonzero(np.triu(finite, k=1))
+            cutoff = -np.inf
+        else:
+            cutoff = np.partition(row_best, -2 * count)[-2 * count]
+            left, right = np.nonzero(strength >= cutoff)
+    keep = (left < right) & (strength[left, right] >= cutoff)
+    left, right = left[keep], right[keep]
+
+    order = np.lexsort((right, left, -strength[left, right]))[:count]
+    return left[order], right[order], values[left[order], right[order]]
+
+
 def _build_correlation_insights(corr):
     if corr.empty or corr.shape[0] < 2:
         return _empty_insights("No standout correlation pairs yet.")
 
-    pair_rows = []
+    left, right, values = _select_insight_pairs(corr.to_numpy(dtype=float))
     columns = corr.columns.tolist()
-    for left_idx, left_ticker in enumerate(columns):
-        for right_idx in range(left_idx + 1, len(columns)):
-            right_ticker = columns[right_idx]
-            value = float(corr.iat[left_idx, right_idx])
-            pair_rows.append(
-                {
-                    "left": left_ticker,
-                    "right": right_ticker,
-                    "correlation": value,
-                    "abs_correlation": abs(value),
-                }
-            )
-
-    if not pair_rows:
-        return _empty_insights("No standout correlation pairs yet.")
-
-    pairs = pd.DataFrame(pair_rows).sort_values("abs_correlation", ascending=False).reset_index(drop=True)
-    threshold = float(pairs["abs_correlation"].quantile(0.8))
-    significant = pairs[pairs["abs_correlation"] >= threshold].head(5)
-    if significant.empty:
-        significant = pairs.head(min(3, len(pairs)))
+    strong_cutoff = np.median(np.abs(values))
 
     insight_items = []
-    for _, row in significant.iterrows():
-        direction = "move together" if row["correlation"] >= 0 else "tend to offset each other"
-        strength = "strong" if row["abs_correlation"] >= significant["abs_correlation"].median() else "notable"
+    for left_idx, right_idx, value in zip(left, right, values):
+        direction = "move together" if value >= 0 else "tend to offset each other"
+        strength = "strong" if abs(value) >= strong_cutoff else "notable"
         insight_items.append(
             html.Li(
-                f"{row['left']} and {row['right']} {direction} with {strength} correlation ({row['correlation']:.2f})."
+                f"{columns[left_idx]} and {columns[right_idx]} {direction} with {strength} correlation ({value:.2f})."
             )
         )
 
@@ -236,7 +343,119 @@ def _build_correlation_insights(corr):
     )
 
 
-def _build_covariance_outputs(holdings):
+def _cluster_tree(corr_values):
+    # Average-linkage tree on the correlation distance sqrt((1 - rho) / 2);
+    # pairs without a correlation are treated as uncorrelated.
+    distance = np.sqrt(np.clip(0.5 * (1.0 - np.nan_to_num(corr_values, nan=0.0)), 0.0, None))
+    np.fill_diagonal(distance, 0.0)
+    return linkage(squareform(distance, checks=False), method="average")
+
+
+def _cluster_labels(tree, order):
+    # Clusters numbered 0..k-1 in dendrogram order, so cluster 0 sits top-left.
+    raw = fcluster(tree, t=HEATMAP_MAX_CLUSTERS, criterion="maxclust")
+    _, first = np.unique(raw[order], return_index=True)
+    ranks = np.empty(first.size, dtype=int)
+    ranks[np.argsort(first)] = np.arange(first.size)
+    return ranks[np.unique(raw, return_inverse=True)[1]]
+
+
+def _cluster_average_correlation(corr_values, labels, clusters):
+    # Mean correlation between members of each pair of clusters (self-pairs excluded).
+    membership = np.zeros((labels.size, clusters))
+    membership[np.arange(labels.size), labels] = 1.0
+    finite = ~np.isnan(corr_values)
+    np.fill_diagonal(finite, False)
+    totals = membership.T @ np.where(finite, corr_values, 0.0) @ membership
+    counts = membership.T @ finite.astype(float) @ membership
+    with np.errstate(invalid="ignore", divide="ignore"):
+        average = totals / counts
+    # A single-ticker cluster is perfectly correlated with itself.
+    return np.where(counts > 0, average, np.where(np.eye(clusters, dtype=bool), 1.0, np.nan))
+
+
+def _ticker_heatmap(corr, title):
+    fig = px.imshow(
+        corr.values,
+        x=corr.columns,
+        y=corr.index,
+        aspect="auto",
+        color_continuous_scale="RdBu",
+        zmin=-1,
+        zmax=1,
+        labels={"x": "Ticker", "y": "Ticker", "color": "Correlation"},
+    )
+    fig.update_traces(
+        hovertemplate="X: %{x}<br>Y: %{y}<br>Correlation: %{z:.2f}<extra></extra>"
+    )
+    fig.update_layout(title=title)
+    return fig
+
+
+def _build_heatmap(corr, weights, observations, order="cluster", cluster=ALL_CLUSTERS):
+    # Returns the figure and the cluster dropdown options.
+    tickers = corr.columns.to_numpy()
+    values = corr.to_numpy(dtype=float)
+    title = f"Correlation Matrix (Daily Returns, Last {observations} Days)"
+    if len(tickers) <= HEATMAP_MAX_TICKERS and order != "cluster":
+        return _ticker_heatmap(corr, title), CLUSTER_OPTIONS_ALL
+
+    tree = _cluster_tree(values)
+    leaf_order = leaves_list(tree)
+    if len(tickers) <= HEATMAP_MAX_TICKERS:
+        ordered = tickers[leaf_order]
+        return _ticker_heatmap(corr.loc[ordered, ordered], f"{title}, clustered"), CLUSTER_OPTIONS_ALL
+
+    labels = _cluster_labels(tree, leaf_order)
+    clusters = int(labels.max()) + 1
+    weight_values = weights.reindex(tickers).fillna(0.0).to_numpy(dtype=float)
+    names = []
+    options = list(CLUSTER_OPTIONS_ALL)
+    for index in range(clusters):
+        members = np.flatnonzero(labels == index)
+        heaviest = members[np.argsort(-weight_values[members], kind="stable")][:3]
+        names.append(f"C{index + 1} ({members.size})")
+        options.append(
+            {
+                "label": f"C{index + 1}: {members.size} ticker{'s' if members.size > 1 else ''},"
+                         f" {weight_values[members].sum():.0%} of weight"
+                         f" ({', '.join(tickers[heaviest])}{', ...' if members.size > 3 else ''})",
+                "value": str(index),
+            }
+        )
+
+    if cluster not in (None, ALL_CLUSTERS) and str(cluster).isdigit() and int(cluster) < clusters:
+        index = int(cluster)
+        members = leaf_order[labels[leaf_order] == index]
+        if order != "cluster":
+            members = members[np.argsort(tickers[members], kind="stable")]
+        subtitle = f"cluster C{index + 1}"
+        if members.size > HEATMAP_MAX_TICKERS:
+            keep = np.sort(np.argsort(-weight_values[members], kind="stable")[:HEATMAP_MAX_TICKERS])
+            subtitle += f", {HEATMAP_MAX_TICKERS} largest of {members.size} holdings"
+            members = members[keep]
+        selected = tickers[members]
+        return _ticker_heatmap(corr.loc[selected, selected], f"{title}, {subtitle}"), options
+
+    average = _cluster_average_correlation(values, labels, clusters)
+    fig = px.imshow(
+        average,
+        x=names,
+        y=names,
+        aspect="auto",
+        color_continuous_scale="RdBu",
+        zmin=-1,
+        zmax=1,
+        labels={"x": "Cluster", "y": "Cluster", "color": "Avg correlation"},
+    )
+    fig.update_traces(
+        hovertemplate="X: %{x}<br>Y: %{y}<br>Average correlation: %{z:.2f}<extra></extra>"
+    )
+    fig.update_layout(title=f"{title}, {len(tickers)} tickers in {clusters} clusters")
+    return fig, options
+
+
+def _build_covariance_outputs(holdings, risk_model="auto", heatmap_order="cluster", cluster=ALL_CLUSTERS):
     default_portfolio, default_spy, default_div = _default_metrics()
 
     if holdings.empty:
@@ -247,23 +466,16 @@ def _build_covariance_outputs(holdings):
             default_portfolio,
             default_spy,
             default_div,
+            CLUSTER_OPTIONS_ALL,
         )
 
     tickers = sorted(holdings["ticker"].dropna().unique().tolist())
-    symbols = sorted(set(tickers + ["SPY"]))
 
     try:
-        history = yf.download(
-            tickers=symbols,
-            period=LOOKBACK_PERIOD,
-            interval=LOOKBACK_INTERVAL,
-            progress=False,
-            auto_adjust=False,
-            group_by="column",
-            threads=False,
-        )
+        estimator = load_covariance(tickers)
+        spy_prices = load_price_history(["SPY"], period=LOOKBACK_PERIOD)
     except Exception as exc:
-        # Fail fast if remote fetch is not available
+        # Fail fast if the local price store is not available
         return (
             html.Div(f"Unable to fetch market data: {exc}"),
             _empty_figure("Market data request failed."),
@@ -271,10 +483,10 @@ def _build_covariance_outputs(holdings):
             default_portfolio,
             default_spy,
             default_div,
+            CLUSTER_OPTIONS_ALL,
         )
 
-    prices_all = _extract_prices(history, symbols)
-    if prices_all.empty:
+    if estimator is None:
         return (
             html.Div("Insufficient price history to compute correlation."),
             _empty_figure("No usable price history."),
@@ -282,43 +494,41 @@ def _build_covariance_outputs(holdings):
             default_portfolio,
             default_spy,
             default_div,
+            CLUSTER_OPTIONS_ALL,
         )
 
     spy_vol_ann = None
-    if "SPY" in prices_all.columns:
-        spy_returns = prices_all["SPY"].ffill().dropna().pct_change().dropna()
+    if "SPY" in spy_prices.columns:
+        spy_returns = spy_prices["SPY"].ffill().dropna().pct_change(fill_method=None).dropna()
         if spy_returns.shape[0] >= 2:
             spy_vol_ann = float(spy_returns.std() * np.sqrt(TRADING_DAYS_PER_YEAR))
 
+    # The covariance state is kept up to date in the database; only tickers
+    # with at least two returns in its window are used.
     requested = set(tickers)
-    portfolio_prices = prices_all[[col for col in prices_all.columns if col in requested]]
-    portfolio_prices = portfolio_prices.dropna(axis=1, how="all")
-    portfolio_prices = portfolio_prices.ffill().dropna(how="all")
-
-    returns = portfolio_prices.pct_change().dropna(how="all")
-    returns = returns.dropna(axis=1, how="all")
+    columns = np.flatnonzero(np.diag(estimator.counts) >= 2)
+    valid_tickers = [estimator.tickers[column] for column in columns]
+    observations = estimator.observations
 
     portfolio_vol_ann = None
     diversification_ratio = None
-    valid_tickers = returns.columns.tolist()
+    risk_model_text = None
+    weights = pd.Series(dtype=float)
 
-    if returns.shape[0] >= 2 and returns.shape[1] >= 1:
-        cov_for_metrics = returns.cov().reindex(index=valid_tickers, columns=valid_tickers).fillna(0.0)
+    if observations >= 2 and valid_tickers:
         weights = _build_weight_series(holdings, valid_tickers)
-
         weight_vec = weights.to_numpy(dtype=float)
-        cov_values = cov_for_metrics.to_numpy(dtype=float)
 
-        variance_daily = float(weight_vec.T @ cov_values @ weight_vec)
-        variance_daily = max(variance_daily, 0.0)
-        sigma_portfolio_daily = float(np.sqrt(variance_daily))
+        resolved_model = _resolve_risk_model(risk_model, len(valid_tickers), observations)
+        sigma_portfolio_daily, asset_vols, risk_model_text = _portfolio_risk(
+            estimator, columns, weight_vec, resolved_model
+        )
 
         portfolio_vol_ann = sigma_portfolio_daily * np.sqrt(TRADING_DAYS_PER_YEAR)
 
         if len(valid_tickers) == 1:
             diversification_ratio = 1.0
         elif sigma_portfolio_daily > 0:
-            asset_vols = np.sqrt(np.clip(np.diag(cov_values), 0.0, None))
             diversification_ratio = float(np.dot(weight_vec, asset_vols) / sigma_portfolio_daily)
 
     portfolio_metric, spy_metric, div_metric = _format_metric_texts(
@@ -328,18 +538,19 @@ def _build_covariance_outputs(holdings):
     )
 
     used_count = len(valid_tickers)
-    observations = returns.shape[0]
     dropped = sorted(requested - set(valid_tickers))
 
     status_parts = [
-        "Window: 1 year (daily).",
+        f"Window: last {observations} trading days (daily, through {estimator.dates[-1]}).",
         f"Tickers used: {used_count} / {len(tickers)}.",
         f"Observations: {observations}.",
     ]
     if dropped:
         status_parts.append(f"Filtered due to missing data: {', '.join(dropped)}.")
+    if risk_model_text:
+        status_parts.append(risk_model_text)
 
-    if returns.shape[0] < 2 or returns.shape[1] < 2:
+    if observations < 2 or len(valid_tickers) < 2:
         status_parts.append("Need at least 2 tickers with usable return history for correlation.")
         return (
             html.Div(" ".join(status_parts)),
@@ -348,9 +559,14 @@ def _build_covariance_outputs(holdings):
             portfolio_metric,
             spy_metric,
             div_metric,
+            CLUSTER_OPTIONS_ALL,
         )
 
-    corr = returns.corr().sort_index().sort_index(axis=1)
+    corr = pd.DataFrame(
+        estimator.correlation()[np.ix_(columns, columns)],
+        index=valid_tickers,
+        columns=valid_tickers,
+    )
     if corr.empty or corr.shape[0] < 2:
         status_parts.append("Correlation matrix unavailable after filtering.")
         return (
@@ -360,22 +576,10 @@ def _build_covariance_outputs(holdings):
             portfolio_metric,
             spy_metric,
             div_metric,
+            CLUSTER_OPTIONS_ALL,
         )
 
-    fig = px.imshow(
-        corr.values,
-        x=corr.columns,
-        y=corr.index,
-        aspect="auto",
-        color_continuous_scale="RdBu",
-        zmin=-1,
-        zmax=1,
-        labels={"x": "Ticker", "y": "Ticker", "color": "Correlation"},
-    )
-    fig.update_traces(
-        hovertemplate="X: %{x}<br>Y: %{y}<br>Correlation: %{z:.2f}<extra></extra>"
-    )
-    fig.update_layout(title="Correlation Matrix (Daily Returns, 1Y)")
+    fig, cluster_options = _build_heatmap(corr, weights, observations, heatmap_order, cluster)
     insights = _build_correlation_insights(corr)
 
     return (
@@ -385,7 +589,88 @@ def _build_covariance_outputs(holdings):
         portfolio_metric,
         spy_metric,
         div_metric,
+        cluster_options,
+    )
+
+
+def _rolling_series(holdings, window):
+    tickers = sorted(holdings["ticker"].dropna().unique().tolist())
+    prices = load_price_history(sorted(set(tickers + ["SPY"])), period=ROLLING_PERIOD)
+    if prices.empty:
+        return None
+
+    returns = prices.ffill().pct_change(fill_method=None).iloc[1:]
+    holding_returns = returns[[ticker for ticker in tickers if ticker in returns.columns]].dropna(axis=1, how="all")
+    if holding_returns.empty:
+        return None
+
+    valid_tickers = holding_returns.columns.tolist()
+    weights = _build_weight_series(holdings, valid_tickers).to_numpy(dtype=float)
+
+    # The returns and weights are the data version: new bars or edited
+    # holdings change the key, repeat views and dropdown flips do not.
+    key = fingerprint(returns, weights, int(window))
+    cached = _rolling_cache.get(key)
+    if cached is not None:
+        return cached
+
+    values = holding_returns.to_numpy(dtype=float)
+    spy = returns["SPY"].to_numpy(dtype=float) if "SPY" in returns.columns else np.full(len(returns), np.nan)
+    # Current weights over the holdings that traded each day.
+    covered = (~np.isnan(values)) @ weights
+    with np.errstate(invalid="ignore", divide="ignore"):
+        portfolio = np.where(covered > 0, np.nan_to_num(values) @ weights / covered, np.nan)
+
+    annualize = np.sqrt(TRADING_DAYS_PER_YEAR)
+    series = {
+        "dates": returns.index,
+        "tickers": valid_tickers,
+        "weights": weights,
+        "holding_vol": rolling_volatility(values, window) * annualize,
+        "portfolio_vol": rolling_volatility(portfolio[:, None], window)[:, 0] * annualize,
+        "spy_vol": rolling_volatility(spy[:, None], window)[:, 0] * annualize,
+        "corr_portfolio": rolling_correlation(values, portfolio, window),
+        "corr_spy": rolling_correlation(values, spy, window),
+        "portfolio_corr_spy": rolling_correlation(portfolio[:, None], spy, window)[:, 0],
+    }
+    _rolling_cache.put(key, series)
+    return series
+
+
+def _build_rolling_chart(series, metric, window):
+    if series is None:
+        return _empty_figure("No usable price history for rolling statistics.")
+
+    # The largest holdings get their own line; the portfolio and SPY lines are always shown.
+    largest = np.argsort(-series["weights"], kind="stable")[:ROLLING_MAX_HOLDINGS]
+    fig = go.Figure()
+    if metric == "volatility":
+        lines = [("Portfolio", series["portfolio_vol"], {"width": 3, "color": "#1d4ed8"})]
+        lines.append(("SPY", series["spy_vol"], {"width": 2, "dash": "dash", "color": "#475569"}))
+        lines += [(series["tickers"][i], series["holding_vol"][:, i], {"width": 1}) for i in largest]
+        title, axis_title, tick_format = "Annualized Volatility", "Volatility", ".0%"
+    else:
+        values = series["corr_spy"] if metric == "spy" else series["corr_portfolio"]
+        lines = []
+        if metric == "spy":
+            lines.append(("Portfolio", series["portfolio_corr_spy"], {"width": 3, "color": "#1d4ed8"}))
+        lines += [(series["tickers"][i], values[:, i], {"width": 1}) for i in largest]
+        reference = "SPY" if metric == "spy" else "Portfolio"
+        title, axis_title, tick_format = f"Correlation with {reference}", "Correlation", ".2f"
+
+    # Skip the warm-up days before the first full window.
+    first = min(window - 1, len(series["dates"]) - 1)
+    for name, values, line in lines:
+        fig.add_trace(go.Scatter(x=series["dates"][first:], y=values[first:], mode="lines", name=name, line=line))
+    fig.update_layout(
+        title=f"Rolling {window}-Day {title}",
+        xaxis_title="Date",
+        yaxis_title=axis_title,
+        template="plotly_white",
+        hovermode="x unified",
     )
+    fig.update_yaxes(tickformat=tick_format)
+    return fig
 
 
 if not hasattr(dash, '_covariance_callback_registered'):
@@ -398,8 +683,34 @@ if not hasattr(dash, '_covariance_callback_registered'):
         Output("covariance-metric-portfolio-vol", "children"),
         Output("covariance-metric-spy-vol", "children"),
         Output("covariance-metric-div-ratio", "children"),
-        Input('cov_location', 'pathname')
+        Output("covariance-cluster", "options"),
+        Input('cov_location', 'pathname'),
+        Input("covariance-risk-model", "value"),
+        Input("covariance-heatmap-order", "value"),
+        Input("covariance-cluster", "value"),
+    )
+    def refresh_covariance(_, risk_model, heatmap_order, cluster):
+        holdings = load_holdings()
+        return _build_covariance_outputs(
+            holdings,
+            risk_model or "auto",
+            heatmap_order or "cluster",
+            cluster or ALL_CLUSTERS,
+        )
+
+    @dash.callback(
+        Output("covariance-rolling-chart", "figure"),
+        Input('cov_location', 'pathname'),
+        Input("covariance-rolling-window", "value"),
+        Input("covariance-rolling-metric", "value"),
     )
-    def refresh_covariance(_):
-        holdings = _load_holdings()
-        return _build_covariance_outputs(holdings)
+    def refresh_rolling(_, window, metric):
+        holdings = load_holdings()
+        if holdings.empty:
+            return _empty_figure("No holdings found.")
+        window = int(window or DEFAULT_ROLLING_WINDOW)
+        try:
+            series = _rolling_series(holdings, window)
+        except Exception as exc:
+            return _empty_figure(f"Unable to load market data: {exc}")
+        return _build_rolling_chart(series, metric or "portfolio", window)
@@ -1,19 +1,59 @@
+from pathlib import Path
+
 import dash
 from dash import Input, Output, dcc, html
 import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
-import yfinance as yf
 
 from pages.covariance import _metric_card
-from Services.helper import load_data
+from Services import background
+from Services.cache import fingerprint
+from Services.covariance_store import load_covariance
+from Services.holdings import load_holdings
+from Services.price_store import load_price_history
+from Services import risk_models, simulation
+from Services.risk_models import FactorCovariance
+from Services.simulation import BlockBootstrapModel, GaussianModel, SimulationRun, horizon_steps
 
 
-TRADING_DAYS_PER_YEAR = 252
 LOOKBACK_PERIOD = "5y"
-LOOKBACK_INTERVAL = "1d"
 DEFAULT_SIMULATIONS = 10000
 DEFAULT_YEARS = 1
+SIMULATION_SEED = 42
+DEFAULT_SAMPLING = "standard"
+DEFAULT_MODEL = "gaussian"
+BOOTSTRAP_BLOCK_DAYS = 21
+MODEL_LABELS = {
+    "gaussian": "Multivariate normal",
+    "factor": "Multivariate normal, factor covariance (PCA)",
+    "ewma": "Multivariate normal, EWMA covariance",
+    "shrinkage": "Multivariate normal, Ledoit-Wolf shrinkage covariance",
+    "bootstrap": "Historical block bootstrap",
+}
+SAMPLING_LABELS = {
+    "standard": "Pseudo-random",
+    "antithetic": "Antithetic variates",
+    "sobol": "Scrambled Sobol (quasi-random)",
+}
+HISTOGRAM_BINS = 40
+# Points per projection band sent to the browser (about weekly for 5 years).
+PROJECTION_POINTS = 261
+
+# Prepared returns are handed from the web process to the job processes through
+# the background disk cache, under the key the browser store carries.
+RETURNS_TTL_SECONDS = 6 * 60 * 60
+# Each simulation runs in its own background job process, so finished runs that
+# can still be grown are kept in the background disk cache, one per
+# returns/model/sampling combination (~5 MB of band counts for 5 years).
+RUN_TTL_SECONDS = 6 * 60 * 60
+# Summaries are shared by every process and survive restarts; the engine source
+# is part of their key, so new simulation code never serves an old result.
+SUMMARY_TTL_SECONDS = 24 * 60 * 60
+ENGINE_VERSION = fingerprint(*(Path(module.__file__).read_bytes() for module in (simulation, risk_models)))
+
+PROGRESS_VISIBLE = {"width": "100%", "height": "8px", "marginBottom": "12px"}
+PROGRESS_HIDDEN = {**PROGRESS_VISIBLE, "display": "none"}
 
 
 dash.register_page(
@@ -46,72 +86,15 @@ def _empty_figure(title, message):
     return fig
 
 
-def _load_holdings():
-    df = load_data().copy()
-    if df.empty:
-        return df
-
-    df["ticker"] = df["ticker"].astype(str).str.strip().str.upper()
-    df = df[df["ticker"] != ""]
-
-    df["market_value_num"] = pd.to_numeric(df["market_value"], errors="coerce")
-    df["shares_num"] = pd.to_numeric(df["shares"], errors="coerce")
-    df["current_price_num"] = pd.to_numeric(df["current_price"], errors="coerce")
-
-    fallback_value = df["shares_num"].fillna(0) * df["current_price_num"].fillna(0)
-    df["position_value"] = df["market_value_num"].where(df["market_value_num"] > 0, fallback_value)
-    df["position_value"] = df["position_value"].where(df["position_value"] > 0, 0.0).fillna(0.0)
-    return df
-
-
-def _extract_prices(data, symbols):
-    if data is None or data.empty:
-        return pd.DataFrame()
-
-    if isinstance(data.columns, pd.MultiIndex):
-        level0 = set(data.columns.get_level_values(0))
-        if "Adj Close" in level0:
-            prices = data["Adj Close"]
-        elif "Close" in level0:
-            prices = data["Close"]
-        else:
-            return pd.DataFrame()
-
-        if isinstance(prices, pd.Series):
-            prices = prices.to_frame()
-
-        prices.columns = [str(column).upper().strip() for column in prices.columns]
-        return prices
-
-    if "Adj Close" in data.columns:
-        series = data["Adj Close"]
-    elif "Close" in data.columns:
-        series = data["Close"]
-    else:
-        return pd.DataFrame()
-
-    symbol = symbols[0].upper().strip() if symbols else "PRICE"
-    return series.to_frame(name=symbol)
-
-
 def _download_prices(tickers):
     if not tickers:
         return pd.DataFrame()
 
     try:
-        history = yf.download(
-            tickers=sorted(set(tickers)),
-            period=LOOKBACK_PERIOD,
-            interval=LOOKBACK_INTERVAL,
-            progress=False,
-            auto_adjust=True,
-            group_by="column",
-            threads=False,
-        )
+        prices = load_price_history(sorted(set(tickers)), period=LOOKBACK_PERIOD)
     except Exception:
         return pd.DataFrame()
 
-    prices = _extract_prices(history, tickers)
     if prices.empty:
         return prices
 
@@ -134,29 +117,162 @@ def _build_weights(holdings, valid_tickers):
     return position_values / total_value, total_value
 
 
-def _simulate_portfolio_paths(returns, weights, initial_value, years, simulations):
-    steps = max(int(years * TRADING_DAYS_PER_YEAR), 1)
-    daily_mean = returns.mean().to_numpy(dtype=float)
-    daily_cov = returns.cov().to_numpy(dtype=float)
-    weight_vector = weights.reindex(returns.columns).fillna(0.0).to_numpy(dtype=float)
+def _build_return_model(returns, weights, model_name, tickers):
+    # returns is a (days x tickers) float64 array with NaN where a ticker has no
+    # history yet; mean and covariance use whatever observations each pair has.
+    if model_name == "bootstrap":
+        return BlockBootstrapModel(returns, weights, block_length=BOOTSTRAP_BLOCK_DAYS)
+    if model_name == "factor":
+        return GaussianModel(mean=np.nanmean(returns, axis=0), cov=FactorCovariance(returns), weights=weights)
+    if model_name in ("ewma", "shrinkage"):
+        # The covariance page's stored estimator (simple daily returns, recent
+        # window) with the drift from the full log-return history. Without any
+        # stored history this falls back to the sample covariance below.
+        estimator = load_covariance(tickers, sync=False)
+        if estimator is not None:
+            cov = pd.DataFrame(estimator.covariance(model_name), index=estimator.tickers, columns=estimator.tickers)
+            return GaussianModel(
+                mean=np.nanmean(returns, axis=0),
+                cov=cov.reindex(index=tickers, columns=tickers).fillna(0.0).to_numpy(dtype=float),
+                weights=weights,
+            )
+    return GaussianModel(
+        mean=np.nanmean(returns, axis=0),
+        cov=pd.DataFrame(returns, copy=False).cov().to_numpy(dtype=float),
+        weights=weights,
+    )
 
-    # Small diagonal jitter improves stability when the covariance matrix is nearly singular.
-    daily_cov = daily_cov + np.eye(daily_cov.shape[0]) * 1e-10
 
-    rng = np.random.default_rng(42)
-    simulated_asset_returns = rng.multivariate_normal(
-        mean=daily_mean,
-        cov=daily_cov,
-        size=(steps, simulations),
-        check_valid="ignore",
+def _simulate_portfolio_paths(returns_key, entry, years, simulations, sampling="standard", model_name="gaussian",
+                              progress=None):
+    # Horizon and path count are not part of the key: a larger request grows the
+    # last run instead of starting over, so only the extra steps and paths are drawn.
+    run_key = ("mc-run", fingerprint(returns_key, sampling, model_name, SIMULATION_SEED, ENGINE_VERSION))
+    steps = horizon_steps(years)
+    cached = background.cache.get(run_key)
+    if cached is not None and cached.can_grow(steps, simulations):
+        run = cached.grow(steps, simulations, progress)
+    else:
+        model = _build_return_model(entry["returns"], entry["weights"], model_name, entry["tickers"])
+        run = SimulationRun(model, seed=SIMULATION_SEED, sampling=sampling).grow(steps, simulations, progress)
+    # A smaller fresh run does not replace a larger one that later requests can still grow.
+    if cached is None or run.steps * run.simulations >= cached.steps * cached.simulations:
+        background.cache.set(run_key, run, expire=RUN_TTL_SECONDS)
+    return run
+
+
+def _summarize_simulation(result, initial_value, years):
+    # The summary is what the figures are built from, so it only keeps binned
+    # counts and thinned band arrays; the per-path values stay out of the payload.
+    final_values = result["final_values"]
+    counts, edges = np.histogram(final_values, bins=HISTOGRAM_BINS)
+    downside_value, median_value, upside_value = np.percentile(final_values, (5, 50, 95))
+    years_axis = result["years_axis"]
+    points = np.unique(np.linspace(0, years_axis.size - 1, PROJECTION_POINTS).round().astype(int))
+    return {
+        "years_axis": years_axis[points],
+        "bands": {percentile: band[points] for percentile, band in result["bands"].items()},
+        "standard_errors": result["standard_errors"],
+        "histogram_counts": counts,
+        "histogram_edges": edges,
+        "median_value": float(median_value),
+        "downside_value": float(downside_value),
+        "upside_value": float(upside_value),
+        "loss_probability": float(np.mean(final_values < initial_value)),
+        "median_cagr": float((median_value / initial_value) ** (1 / max(int(years), 1)) - 1),
+    }
+
+
+def _run_simulation(returns_key, entry, initial_value, years, simulations, sampling, model_name, progress=None):
+    # The seed is fixed, so a summary is fully determined by these inputs.
+    key = ("mc-summary", fingerprint(returns_key, float(initial_value), int(years), int(simulations), sampling,
+                                     model_name, SIMULATION_SEED, ENGINE_VERSION))
+    summary = background.cache.get(key)
+    background.count_lookup("mc-summary", summary is not None)
+    if summary is not None:
+        return summary
+
+    run = _simulate_portfolio_paths(
+        returns_key=returns_key,
+        entry=entry,
+        years=years,
+        simulations=simulations,
+        sampling=sampling,
+        model_name=model_name,
+        progress=progress,
     )
-    simulated_portfolio_returns = simulated_asset_returns @ weight_vector
-    growth = np.cumprod(np.exp(simulated_portfolio_returns), axis=0)
+    summary = _summarize_simulation(run.result(initial_value), initial_value, years)
+    background.cache.set(key, summary, expire=SUMMARY_TTL_SECONDS)
+    return summary
+
+
+def _prepare_returns():
+    holdings = load_holdings()
+    if holdings.empty:
+        return {"error": "No holdings found. Add positions on the Portfolio page first."}
+
+    tickers = sorted(holdings["ticker"].dropna().unique().tolist())
+    prices = _download_prices(tickers)
+    if prices.empty:
+        return {"error": "Unable to fetch enough price history to run the simulation."}
+
+    prices = prices[[column for column in prices.columns if column in tickers]]
+    prices = prices.dropna(axis=1, how="all")
+    if prices.empty:
+        return {"error": "Not enough clean price history after filtering missing data."}
+
+    # Compute returns per ticker independently — don't require all tickers
+    # to share the same dates. mean() and cov() handle NaN pairwise.
+    returns = np.log(prices / prices.shift(1))
+    returns = returns.dropna(axis=1, thresh=30)  # drop tickers with < 30 observations
+    returns = returns.dropna(how="all")           # drop days where every ticker is NaN
+
+    valid_tickers = returns.columns.tolist()
+    if returns.empty or not valid_tickers:
+        return {"error": "Return history is unavailable after filtering."}
+
+    min_obs = int(returns.notna().sum().min())
+    if min_obs < 30:
+        return {"error": "Not enough clean price history after filtering missing data."}
+
+    weights, current_value = _build_weights(holdings, valid_tickers)
+    if weights.empty or current_value <= 0:
+        return {"error": "Current portfolio value is zero, so the simulation cannot run."}
+
+    # Only a key crosses the wire; the arrays stay on the server.
+    returns_values = returns.to_numpy(dtype=float, copy=False)
+    weight_values = weights.reindex(valid_tickers).to_numpy(dtype=float)
+    returns_key = fingerprint(returns_values, weight_values, valid_tickers)
+    background.cache.set(
+        ("mc-returns", returns_key),
+        {"returns": returns_values, "weights": weight_values, "tickers": valid_tickers},
+        expire=RETURNS_TTL_SECONDS,
+    )
+
+    dropped = sorted(set(tickers) - set(valid_tickers))
+    return {
+        "returns_key": returns_key,
+        "current_value": current_value,
+        "valid_tickers": valid_tickers,
+        "total_tickers": len(tickers),
+        "min_obs": min_obs,
+        "max_obs": int(returns.notna().sum().max()),
+        "dropped": dropped,
+        "error": None,
+    }
+
+
+def _lookup_returns(cache):
+    entry = background.cache.get(("mc-returns", cache["returns_key"]))
+    if entry is not None:
+        return cache, entry
 
-    starting_row = np.full((1, simulations), float(initial_value))
-    path_values = np.vstack([starting_row, initial_value * growth])
-    time_axis = np.arange(path_values.shape[0]) / TRADING_DAYS_PER_YEAR
-    return time_axis, path_values
+    # Expired or evicted: rebuild from the local price store rather than
+    # shipping the data through the browser.
+    rebuilt = _prepare_returns()
+    if rebuilt.get("error"):
+        return rebuilt, None
+    return rebuilt, background.cache.get(("mc-returns", rebuilt["returns_key"]))
 
 
 def _format_currency(value):
@@ -167,12 +283,12 @@ def _format_percent(value):
     return f"{value:.1%}"
 
 
-def _build_projection_chart(years_axis, path_values):
-    percentile_5 = np.percentile(path_values, 5, axis=1)
-    percentile_25 = np.percentile(path_values, 25, axis=1)
-    percentile_50 = np.percentile(path_values, 50, axis=1)
-    percentile_75 = np.percentile(path_values, 75, axis=1)
-    percentile_95 = np.percentile(path_values, 95, axis=1)
+def _build_projection_chart(years_axis, bands):
+    percentile_5 = bands[5]
+    percentile_25 = bands[25]
+    percentile_50 = bands[50]
+    percentile_75 = bands[75]
+    percentile_95 = bands[95]
 
     fig = go.Figure()
     fig.add_trace(
@@ -237,18 +353,25 @@ def _build_projection_chart(years_axis, path_values):
     return fig
 
 
-def _build_distribution_chart(final_values, initial_value):
+def _build_distribution_chart(summary, initial_value):
+    counts = summary["histogram_counts"]
+    edges = summary["histogram_edges"]
     fig = go.Figure()
     fig.add_trace(
-        go.Histogram(
-            x=final_values,
-            nbinsx=40,
+        go.Bar(
+            x=(edges[:-1] + edges[1:]) / 2,
+            y=counts,
+            width=float(edges[1] - edges[0]),
             marker={"color": "#60a5fa"},
             name="Ending values",
         )
     )
-    for percentile, color in ((5, "#dc2626"), (50, "#1d4ed8"), (95, "#16a34a")):
-        value = float(np.percentile(final_values, percentile))
+    markers = (
+        (5, summary["downside_value"], "#dc2626"),
+        (50, summary["median_value"], "#1d4ed8"),
+        (95, summary["upside_value"], "#16a34a"),
+    )
+    for percentile, value, color in markers:
         fig.add_vline(
             x=value,
             line_width=2,
@@ -270,12 +393,19 @@ def _build_distribution_chart(final_values, initial_value):
         xaxis_title="Ending Value",
         yaxis_title="Simulation Count",
         template="plotly_white",
+        bargap=0,
     )
     fig.update_xaxes(tickprefix="$", separatethousands=True)
     return fig
 
 
-def _build_explanation(current_value, median_value, downside_value, upside_value, loss_probability, years, simulations):
+def _format_standard_error(value):
+    return "n/a" if value is None else f"±{_format_currency(value)}"
+
+
+def _build_explanation(current_value, median_value, downside_value, upside_value, loss_probability, years, simulations,
+                       sampling="standard", model_name="gaussian", standard_errors=None):
+    standard_errors = standard_errors or {}
     return html.Div(
         [
             html.H4("How to read this", style={"marginTop": "0"}),
@@ -293,6 +423,14 @@ def _build_explanation(current_value, median_value, downside_value, upside_value
                 f"Starting from {_format_currency(current_value)}, the model estimates a "
                 f"{_format_percent(loss_probability)} chance of finishing below today's value."
             ),
+            html.P(
+                f"Return model: {MODEL_LABELS.get(model_name, model_name)}. "
+                f"Sampling: {SAMPLING_LABELS.get(sampling, sampling)}. Estimated standard error of the median "
+                f"{_format_standard_error(standard_errors.get(50))}, of the 5th percentile "
+                f"{_format_standard_error(standard_errors.get(5))} and of the 95th percentile "
+                f"{_format_standard_error(standard_errors.get(95))}, from the spread between independent batches "
+                "of paths. If these are small next to the gaps between the percentiles, fewer paths would do."
+            ),
             html.P(
                 "This is a probability model, not a forecast. It assumes the future behaves broadly like the recent return "
                 "distribution and covariance structure, and it does not model trading, contributions, taxes, or regime changes."
@@ -346,6 +484,36 @@ layout = html.Div(
                     ],
                     style={"minWidth": "180px", "flex": "1"},
                 ),
+                html.Div(
+                    [
+                        html.Label("Return model"),
+                        dcc.Dropdown(
+                            id="mc-model",
+                            options=[
+                                {"label": label, "value": value}
+                                for value, label in MODEL_LABELS.items()
+                            ],
+                            value=DEFAULT_MODEL,
+                            clearable=False,
+                        ),
+                    ],
+                    style={"minWidth": "180px", "flex": "1"},
+                ),
+                html.Div(
+                    [
+                        html.Label("Sampling"),
+                        dcc.Dropdown(
+                            id="mc-sampling",
+                            options=[
+                                {"label": label, "value": value}
+                                for value, label in SAMPLING_LABELS.items()
+                            ],
+                            value=DEFAULT_SAMPLING,
+                            clearable=False,
+                        ),
+                    ],
+                    style={"minWidth": "180px", "flex": "1"},
+                ),
             ],
             style={"display": "flex", "gap": "12px", "flexWrap": "wrap", "marginBottom": "12px"},
         ),
@@ -361,6 +529,7 @@ layout = html.Div(
             style={"display": "flex", "gap": "12px", "flexWrap": "wrap", "marginBottom": "12px"},
         ),
         html.Div(id="mc-status", style={"marginBottom": "12px"}),
+        html.Progress(id="mc-progress", value="0", max="100", style=PROGRESS_HIDDEN),
         dcc.Graph(id="mc-projection-chart"),
         dcc.Graph(id="mc-distribution-chart"),
         html.Div(id="mc-explanation"),
@@ -379,50 +548,7 @@ if not hasattr(dash, "_monte_carlo_callback_registered"):
         Input("mc-location", "pathname"),
     )
     def fetch_prices(_pathname):
-        holdings = _load_holdings()
-        if holdings.empty:
-            return {"error": "No holdings found. Add positions on the Portfolio page first."}
-
-        tickers = sorted(holdings["ticker"].dropna().unique().tolist())
-        prices = _download_prices(tickers)
-        if prices.empty:
-            return {"error": "Unable to fetch enough price history to run the simulation."}
-
-        prices = prices[[column for column in prices.columns if column in tickers]]
-        prices = prices.dropna(axis=1, how="all")
-        if prices.empty:
-            return {"error": "Not enough clean price history after filtering missing data."}
-
-        # Compute returns per ticker independently — don't require all tickers
-        # to share the same dates. mean() and cov() handle NaN pairwise.
-        returns = np.log(prices / prices.shift(1))
-        returns = returns.dropna(axis=1, thresh=30)  # drop tickers with < 30 observations
-        returns = returns.dropna(how="all")           # drop days where every ticker is NaN
-
-        valid_tickers = returns.columns.tolist()
-        if returns.empty or not valid_tickers:
-            return {"error": "Return history is unavailable after filtering."}
-
-        min_obs = int(returns.notna().sum().min())
-        if min_obs < 30:
-            return {"error": "Not enough clean price history after filtering missing data."}
-
-        weights, current_value = _build_weights(holdings, valid_tickers)
-        if weights.empty or current_value <= 0:
-            return {"error": "Current portfolio value is zero, so the simulation cannot run."}
-
-        dropped = sorted(set(tickers) - set(valid_tickers))
-        return {
-            "returns_json": returns.to_json(orient="split"),
-            "weights_json": weights.to_json(orient="split"),
-            "current_value": current_value,
-            "valid_tickers": valid_tickers,
-            "total_tickers": len(tickers),
-            "min_obs": min_obs,
-            "max_obs": int(returns.notna().sum().max()),
-            "dropped": dropped,
-            "error": None,
-        }
+        return _prepare_returns()
 
     @dash.callback(
         Output("mc-status", "children"),
@@ -438,8 +564,17 @@ if not hasattr(dash, "_monte_carlo_callback_registered"):
         Input("mc-price-cache", "data"),
         Input("mc-years", "value"),
         Input("mc-simulations", "value"),
+        Input("mc-sampling", "value"),
+        Input("mc-model", "value"),
+        # Runs in a job process so large simulations do not hold a web worker.
+        # Changing an input mid-run terminates the old job: the browser sends
+        # its id along with the new request.
+        background=True,
+        progress=[Output("mc-progress", "value"), Output("mc-progress", "max")],
+        running=[(Output("mc-progress", "style"), PROGRESS_VISIBLE, PROGRESS_HIDDEN)],
+        interval=500,
     )
-    def update_monte_carlo(cache, years, simulations):
+    def update_monte_carlo(set_progress, cache, years, simulations, sampling, model_name):
         empty_projection = _empty_figure("Projected Portfolio Value Paths", "No simulation data available.")
         empty_distribution = _empty_figure("Distribution of Ending Portfolio Values", "No simulation data available.")
         blank = ("--",) * 6
@@ -451,24 +586,33 @@ if not hasattr(dash, "_monte_carlo_callback_registered"):
         if error:
             return (error, empty_projection, empty_distribution, *blank, html.Div(error))
 
-        returns = pd.read_json(cache["returns_json"], orient="split")
-        weights = pd.read_json(cache["weights_json"], orient="split", typ="series")
-        current_value = float(cache["current_value"])
+        cache, entry = _lookup_returns(cache)
+        if entry is None:
+            error = cache.get("error") or "Return history is unavailable."
+            return (error, empty_projection, empty_distribution, *blank, html.Div(error))
 
-        years_axis, path_values = _simulate_portfolio_paths(
-            returns=returns,
-            weights=weights,
+        current_value = float(cache["current_value"])
+        model_name = model_name or DEFAULT_MODEL
+        sampling = sampling or DEFAULT_SAMPLING
+        if model_name == "bootstrap":
+            # Resampled history has no normal draws to pair up or stratify.
+            sampling = "standard"
+
+        summary = _run_simulation(
+            returns_key=cache["returns_key"],
+            entry=entry,
             initial_value=current_value,
             years=int(years or DEFAULT_YEARS),
             simulations=int(simulations or DEFAULT_SIMULATIONS),
+            sampling=sampling,
+            model_name=model_name,
+            progress=lambda done, total: set_progress((str(int(100 * done / max(total, 1))), "100")),
         )
-
-        final_values = path_values[-1]
-        median_value = float(np.percentile(final_values, 50))
-        downside_value = float(np.percentile(final_values, 5))
-        upside_value = float(np.percentile(final_values, 95))
-        loss_probability = float(np.mean(final_values < current_value))
-        median_cagr = float((median_value / current_value) ** (1 / max(int(years), 1)) - 1)
+        median_value = summary["median_value"]
+        downside_value = summary["downside_value"]
+        upside_value = summary["upside_value"]
+        loss_probability = summary["loss_probability"]
+        median_cagr = summary["median_cagr"]
 
         n = len(cache["valid_tickers"])
         status_parts = [
@@ -478,11 +622,13 @@ if not hasattr(dash, "_monte_carlo_callback_registered"):
         ]
         if cache.get("dropped"):
             status_parts.append(f"Filtered due to missing price history: {', '.join(cache['dropped'])}.")
+        cache_stats = background.cache_stats("mc-summary")
+        status_parts.append(f"Simulation cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses.")
 
         return (
             " ".join(status_parts),
-            _build_projection_chart(years_axis, path_values),
-            _build_distribution_chart(final_values, current_value),
+            _build_projection_chart(summary["years_axis"], summary["bands"]),
+            _build_distribution_chart(summary, current_value),
             _format_currency(current_value),
             _format_currency(median_value),
             _format_currency(downside_value),
@@ -497,5 +643,8 @@ if not hasattr(dash, "_monte_carlo_callback_registered"):
                 loss_probability=loss_probability,
                 years=int(years or DEFAULT_YEARS),
                 simulations=int(simulations or DEFAULT_SIMULATIONS),
+                sampling=sampling,
+                model_name=model_name,
+                standard_errors=summary["standard_errors"],
             ),
         )
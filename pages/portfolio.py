@@ -3,16 +3,15 @@ import dash
 from dash.dependencies import Input, Output, State
 
 import pandas as pd
-import sqlite3
 import plotly.express as px
 import plotly.graph_objects as go
 
-from Services.updater import update_prices
-from Services.helper import load_data
+from Services.holdings import HOLDING_COLUMNS, load_holdings
+from Services.ledger import record_transactions
+from Services.snapshots import portfolio_value, record_snapshot
 
 
 
-DB_PATH = "portfolio.db"
 
 
 
@@ -126,95 +125,25 @@ def modify_portfolio(action, ticker, shares=None, avg_price=None, holding_type=N
     if action not in {"add", "remove"}:
         raise ValueError("Invalid action supplied.")
 
-    def _to_float(value, default=0.0):
-        try:
-            return float(value)
-        except (TypeError, ValueError):
-            return default
-
-    with sqlite3.connect(DB_PATH) as conn:
-        conn.row_factory = sqlite3.Row
-        existing = conn.execute(
-            "SELECT * FROM portfolio WHERE ticker = ?", (ticker,)
-        ).fetchone()
-
-        if action == "add":
-            if shares is None or avg_price is None or holding_type is None:
-                raise ValueError("Shares, average price, and holding type are required to add a ticker.")
-
-            shares = float(shares)
-            avg_price = float(avg_price)
-            current_price = _to_float(existing["current_price"]) if existing else 0.0
-            price_basis = current_price if current_price else avg_price
-            market_value = price_basis * shares
-            total_profit_loss = (current_price - avg_price) * shares if current_price else 0.0
-            timestamp = pd.Timestamp.now().isoformat()
-
-            if existing:
-                conn.execute(
-                    """
-                    UPDATE portfolio
-                    SET shares = ?, avg_price = ?, market_value = ?,
-                        Total_Profit_Loss = ?, last_updated = ?, holding_type=?
-                    WHERE ticker = ?
-                    """,
-                    (shares, avg_price, market_value,total_profit_loss, timestamp, holding_type, ticker),
-                )
-            else:
-                conn.execute(
-                    """
-                    INSERT INTO portfolio (ticker, shares, avg_price, current_price,
-                    market_value, Total_Profit_Loss, holding_type, last_updated
-                                        )
-                     VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                                                    """,
-                        (
-                            ticker,
-                            shares,
-                            avg_price,
-                            current_price,
-                            market_value,
-                            total_profit_loss,
-                            holding_type,
-                            timestamp,
-                        ),
-                    )
-
-        elif action == "remove":
-            if not existing:
-                raise ValueError("Ticker not found in portfolio.")
-            if shares is None:
-                raise ValueError("Shares are required when removing a ticker.")
-
-            current_shares = _to_float(existing["shares"])
-            new_shares = current_shares - float(shares)
-
-            if new_shares <= 0:
-                conn.execute("DELETE FROM portfolio WHERE ticker = ?", (ticker,))
-            else:
-                avg_price_existing = _to_float(existing["avg_price"])
-                current_price = _to_float(existing["current_price"])
-                price_basis = current_price if current_price else avg_price_existing
-                market_value = price_basis * new_shares
-                total_profit_loss = (
-                    (current_price - avg_price_existing) * new_shares if current_price else 0.0
-                )
-                timestamp = pd.Timestamp.now().isoformat()
-
-                conn.execute(
-                    """
-                    UPDATE portfolio
-                    SET shares = ?, market_value = ?, Total_Profit_Loss = ?, last_updated = ?
-                WHERE ticker = ?
-                                """,
-                        (
-                            new_shares,
-                            market_value,
-                            total_profit_loss,
-                            timestamp,
-                            ticker,
-                        ),
-                                        )
+    # Edits are appended to the transaction ledger, which updates the position.
+    if action == "add":
+        if shares is None or avg_price is None or holding_type is None:
+            raise ValueError("Shares, average price, and holding type are required to add a ticker.")
+        transaction = {"ticker": ticker, "side": "buy", "shares": shares, "price": avg_price,
+                       "holding_type": holding_type}
+
+    elif action == "remove":
+        if ticker not in set(load_holdings()["ticker"]):
+            raise ValueError("Ticker not found in portfolio.")
+        if shares is None:
+            raise ValueError("Shares are required when removing a ticker.")
+        transaction = {"ticker": ticker, "side": "sell", "shares": shares}
+
+    value_before = portfolio_value()
+    record_transactions([transaction])
+
+    # The value the edit added or removed is a cash flow in the snapshot history.
+    record_snapshot(value_before)
 
 
 dash.register_page(__name__, path="/", name="Portfolio", title="Portfolio")
@@ -245,7 +174,7 @@ layout = html.Div([
     dash_table.DataTable(
         id="portfolio-table",
         hidden_columns=["id"],
-        columns=[{"name": i, "id": i, "type": "text"} for i in load_data().columns],
+        columns=[{"name": i, "id": i, "type": "text"} for i in HOLDING_COLUMNS],
         data=[],
         style_data_conditional=[{"if": {"filter_query": "{ticker} = 'TOTAL'"},
                                     "fontWeight": "bold",
@@ -291,13 +220,9 @@ def modify_data(add_clicks, remove_clicks, n_intervals, ticker, shares, avg_pric
     except ValueError:
         pass
 
-    if button_id == "interval-component" and n_intervals:
-        try:
-            update_prices()
-        except Exception:
-            pass
-
-    df = load_data()
+    # Prices are refreshed by the background refresher started in app.py; the
+    # interval tick only re-reads what it has persisted.
+    df = load_holdings()
     if df.empty:
         table_df = pd.DataFrame(
             [
@@ -315,7 +240,7 @@ def modify_data(add_clicks, remove_clicks, n_intervals, ticker, shares, avg_pric
             ]
         )
         return (
-            table_df[load_data().columns].to_dict("records"),
+            table_df[HOLDING_COLUMNS].to_dict("records"),
             make_big_pie(pd.DataFrame(columns=["ticker", "market_value_num"])),
             make_holding_type_chart(pd.DataFrame(columns=["holding_type", "market_value_num"])),
         )
@@ -12,3 +12,63 @@ CREATE TABLE IF NOT EXISTS portfolio (
 );
 
 
+CREATE TABLE IF NOT EXISTS price_history (
+    ticker TEXT NOT NULL,
+    date TEXT NOT NULL,
+    close REAL,
+    PRIMARY KEY (ticker, date)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS price_history_sync (
+    ticker TEXT PRIMARY KEY,
+    covered_from TEXT,
+    last_date TEXT,
+    synced_at TIMESTAMP
+);
+
+
+CREATE TABLE IF NOT EXISTS covariance_state (
+    universe TEXT PRIMARY KEY,
+    tickers TEXT NOT NULL,
+    last_date TEXT NOT NULL,
+    state BLOB NOT NULL,
+    updated_at TIMESTAMP
+);
+
+
+CREATE TABLE IF NOT EXISTS holding_snapshots (
+    taken_at TEXT NOT NULL,
+    ticker TEXT NOT NULL,
+    shares REAL,
+    price REAL,
+    market_value REAL,
+    PRIMARY KEY (taken_at, ticker)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS portfolio_snapshots (
+    taken_at TEXT PRIMARY KEY,
+    market_value REAL NOT NULL,
+    cash_flow REAL NOT NULL DEFAULT 0,
+    holdings INTEGER,
+    recorded_at TIMESTAMP
+) WITHOUT ROWID;
+
+
+CREATE TABLE IF NOT EXISTS transactions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ticker TEXT NOT NULL,
+    trade_date TEXT NOT NULL,
+    side TEXT NOT NULL CHECK (side IN ('buy', 'sell')),
+    shares REAL NOT NULL CHECK (shares > 0),
+    price REAL,
+    holding_type TEXT,
+    note TEXT,
+    recorded_at TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_transactions_ticker_date ON transactions (ticker, trade_date);
+CREATE INDEX IF NOT EXISTS idx_transactions_date ON transactions (trade_date);
+
+CREATE TABLE IF NOT EXISTS ledger_state (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    applied_through INTEGER NOT NULL
+);
@@ -0,0 +1,20 @@
+import pytest
+
+from Services import covariance_store, database, holdings, ledger, price_store
+
+
+@pytest.fixture
+def portfolio_db(tmp_path, monkeypatch):
+    # A fresh portfolio.db per test; modules that check their schema once per
+    # process check it again against this one.
+    path = tmp_path / "portfolio.db"
+    monkeypatch.setattr(database, "DB_PATH", str(path))
+    monkeypatch.setattr(database, "_engine", None)
+    for module in (holdings, ledger, price_store, covariance_store):
+        monkeypatch.setattr(module, "_schema_ready", False)
+    monkeypatch.setattr(holdings, "_conn", None)
+    monkeypatch.setattr(holdings, "_holdings", None)
+    holdings.load_holdings()
+    yield path
+    database.get_engine().dispose()
+    holdings._conn.close()
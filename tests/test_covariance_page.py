@@ -0,0 +1,47 @@
+import dash
+import numpy as np
+import pandas as pd
+import pytest
+
+# Page modules register themselves and need an app to exist first.
+dash.Dash(__name__, use_pages=True, pages_folder="")
+from pages.covariance import INSIGHT_PAIRS, INSIGHT_QUANTILE, _build_heatmap, _select_insight_pairs  # noqa: E402
+
+
+def _pairs_by_sort(values):
+    left, right = np.triu_indices(values.shape[0], k=1)
+    strength = np.abs(values[left, right])
+    keep = ~np.isnan(strength)
+    left, right, strength = left[keep], right[keep], strength[keep]
+    if left.size < 21:
+        above = strength >= np.quantile(strength, INSIGHT_QUANTILE)
+        left, right, strength = left[above], right[above], strength[above]
+    order = np.lexsort((right, left, -strength))[:INSIGHT_PAIRS]
+    return left[order], right[order]
+
+
+@pytest.mark.parametrize("tickers", [3, 5, 7, 8, 9, 10, 25, 60])
+def test_insight_pairs_are_the_strongest(tickers):
+    rng = np.random.default_rng(tickers)
+    for _ in range(50):
+        values = np.corrcoef(rng.normal(size=(tickers, 40)))
+        left, right, correlations = _select_insight_pairs(values.copy())
+        expected_left, expected_right = _pairs_by_sort(values)
+        np.testing.assert_array_equal(left, expected_left)
+        np.testing.assert_array_equal(right, expected_right)
+        np.testing.assert_array_equal(correlations, values[left, right])
+
+
+def test_insight_pairs_skip_missing_correlations():
+    values = np.corrcoef(np.random.default_rng(0).normal(size=(12, 40)))
+    values[3, :] = values[:, 3] = np.nan
+    left, right, _ = _select_insight_pairs(values.copy())
+    assert len(left) == INSIGHT_PAIRS
+    assert 3 not in left and 3 not in right
+
+
+def test_heatmap_title_names_the_window():
+    tickers = list("ABCDE")
+    corr = pd.DataFrame(np.corrcoef(np.random.default_rng(0).normal(size=(5, 60))), index=tickers, columns=tickers)
+    fig, _ = _build_heatmap(corr, pd.Series(0.2, index=tickers), 126)
+    assert "126 Days" in fig.layout.title.text
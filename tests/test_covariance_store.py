@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from Services import covariance_store
+from Services.database import connect
+
+TICKERS = ["AAA", "BBB", "CCC"]
+
+
+class FakeHistory:
+    # Stands in for the price store: closes up to `through`, with each ticker's
+    # sync state covering what is visible.
+    def __init__(self):
+        rng = np.random.default_rng(1)
+        dates = pd.bdate_range("2023-01-02", periods=300)
+        returns = rng.normal(0.0003, 0.01, size=(len(dates), len(TICKERS)))
+        self.closes = pd.DataFrame(100 * np.exp(np.cumsum(returns, axis=0)), index=dates, columns=TICKERS)
+        # CCC misses a few sessions; the store forward-fills them.
+        self.closes.iloc[[50, 51, 120], 2] = np.nan
+        self.through = len(dates)
+        self.revised_at = None
+
+    def load_price_history(self, tickers, period="1y", sync=True, start=None, end=None):
+        closes = self.closes.iloc[:self.through]
+        if start is not None:
+            closes = closes[closes.index >= start]
+        return closes[list(tickers)]
+
+    def load_sync_state(self, tickers):
+        last = self.closes.index[self.through - 1].strftime("%Y-%m-%d")
+        first = self.closes.index[0].strftime("%Y-%m-%d")
+        return {ticker: (first, last, self.revised_at) for ticker in tickers}
+
+
+@pytest.fixture
+def history(portfolio_db, monkeypatch):
+    fake = FakeHistory()
+    monkeypatch.setattr(covariance_store, "load_price_history", fake.load_price_history)
+    monkeypatch.setattr(covariance_store, "load_sync_state", fake.load_sync_state)
+    return fake
+
+
+def _fresh(history):
+    with connect() as conn:
+        conn.execute("DELETE FROM covariance_state")
+    return covariance_store.load_covariance(TICKERS, sync=False)
+
+
+def _assert_same_estimator(actual, expected):
+    assert actual.dates == expected.dates
+    for name, value in expected.state().items():
+        if name == "dates":
+            continue
+        np.testing.assert_allclose(actual.state()[name], value, rtol=1e-9, atol=1e-15, err_msg=name)
+    np.testing.assert_allclose(actual.covariance("shrinkage"), expected.covariance("shrinkage"), rtol=1e-9)
+
+
+def test_refold_matches_fresh_estimator(history):
+    for through in (100, 101, 180, 300):
+        history.through = through
+        folded = covariance_store.load_covariance(TICKERS, sync=False)
+        _assert_same_estimator(folded, _fresh(history))
+        covariance_store.load_covariance(TICKERS, sync=False)
+
+
+def test_revised_history_is_refolded_from_scratch(history):
+    history.through = 200
+    covariance_store.load_covariance(TICKERS, sync=False)
+    # A split adjustment rescales the stored history of one ticker.
+    history.closes["BBB"] *= 0.5
+    history.closes.iloc[150:, 1] *= 1.1
+    history.revised_at = "2024-01-01T00:00:00"
+    history.through = 220
+    refolded = covariance_store.load_covariance(TICKERS, sync=False)
+    _assert_same_estimator(refolded, _fresh(history))
+
+
+def test_old_universes_are_pruned(history, monkeypatch):
+    monkeypatch.setattr(covariance_store, "MAX_STATES", 2)
+    for tickers in (["AAA", "BBB"], ["AAA", "CCC"], ["BBB", "CCC"], TICKERS):
+        covariance_store.load_covariance(tickers, sync=False)
+    with connect() as conn:
+        kept = [row[0] for row in conn.execute("SELECT tickers FROM covariance_state ORDER BY updated_at")]
+    assert kept == ["BBB,CCC", "AAA,BBB,CCC"]
@@ -0,0 +1,74 @@
+import random
+
+import pytest
+
+from Services import ledger
+from Services.database import connect
+
+
+def _positions():
+    with connect() as conn:
+        rows = conn.execute("SELECT ticker, shares, avg_price FROM portfolio ORDER BY ticker").fetchall()
+    return [(ticker, pytest.approx(shares), pytest.approx(avg_price)) for ticker, shares, avg_price in rows]
+
+
+def _random_trades(rng, count):
+    return [
+        {
+            "ticker": rng.choice(["AAA", "BBB", "ccc "]),
+            "side": rng.choice(["buy", "buy", "sell"]),
+            "shares": rng.randint(1, 10),
+            "price": rng.randint(10, 100),
+            "trade_date": f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+        }
+        for _ in range(count)
+    ]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_incremental_apply_matches_rebuild(portfolio_db, seed):
+    # Batches arrive out of trade-date order, as imports of older statements do.
+    rng = random.Random(seed)
+    for _ in range(20):
+        ledger.record_transactions(_random_trades(rng, rng.randint(1, 4)))
+        applied = _positions()
+        ledger.rebuild_positions()
+        assert _positions() == applied
+
+
+def test_backdated_trade_is_folded_in_date_order(portfolio_db):
+    ledger.record_transactions([
+        {"ticker": "AAA", "side": "buy", "shares": 10, "price": 10.0, "trade_date": "2024-03-01"},
+        {"ticker": "AAA", "side": "sell", "shares": 5, "trade_date": "2024-04-01"},
+    ])
+    ledger.record_transactions([{"ticker": "AAA", "side": "buy", "shares": 10, "price": 20.0, "trade_date": "2024-02-01"}])
+    # 10 @ 20, then 10 @ 10 averages 15; the sell leaves the average alone.
+    assert _positions() == [("AAA", 15.0, 15.0)]
+
+
+def test_selling_out_closes_the_position(portfolio_db):
+    ledger.record_transactions([
+        {"ticker": "AAA", "side": "buy", "shares": 0.3, "price": 10.0, "trade_date": "2024-01-02"},
+        {"ticker": "AAA", "side": "buy", "shares": 0.6, "price": 10.0, "trade_date": "2024-01-03"},
+        {"ticker": "BBB", "side": "buy", "shares": 1, "price": 10.0, "trade_date": "2024-01-03"},
+    ])
+    ledger.record_transactions([{"ticker": "AAA", "side": "sell", "shares": 0.9, "trade_date": "2024-01-04"}])
+    assert _positions() == [("BBB", 1.0, 10.0)]
+
+
+def test_opening_balances_replay_first(portfolio_db):
+    with connect() as conn:
+        conn.execute("INSERT INTO portfolio (ticker, shares, avg_price, current_price) VALUES ('AAA', 10, 50.0, 55.0)")
+    ledger.record_transactions([{"ticker": "AAA", "side": "buy", "shares": 10, "price": 30.0, "trade_date": "2020-01-02"}])
+    assert _positions() == [("AAA", 20.0, 40.0)]
+    ledger.rebuild_positions()
+    assert _positions() == [("AAA", 20.0, 40.0)]
+
+
+def test_invalid_transactions_are_rejected(portfolio_db):
+    with pytest.raises(ValueError):
+        ledger.record_transactions([{"ticker": "AAA", "side": "hold", "shares": 1}])
+    with pytest.raises(ValueError):
+        ledger.record_transactions([{"ticker": " ", "side": "buy", "shares": 1}])
+    with pytest.raises(ValueError):
+        ledger.record_transactions([{"ticker": "AAA", "side": "buy", "shares": 0}])
@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from Services.rolling import (
+    rolling_beta,
+    rolling_correlation,
+    rolling_max_drawdown,
+    rolling_mean,
+    rolling_volatility,
+)
+
+
+@pytest.fixture
+def returns():
+    # Three series with gaps: one listed late, two with scattered missing days.
+    rng = np.random.default_rng(7)
+    values = rng.normal(0.0005, 0.01, size=(300, 3))
+    values[:40, 0] = np.nan
+    values[rng.random(300) < 0.05, 1] = np.nan
+    values[rng.random(300) < 0.05, 2] = np.nan
+    return pd.DataFrame(values, columns=["AAA", "BBB", "CCC"])
+
+
+@pytest.fixture
+def reference(returns):
+    rng = np.random.default_rng(8)
+    values = 0.6 * returns.fillna(0.0).mean(axis=1).to_numpy() + rng.normal(0.0, 0.005, size=len(returns))
+    values[rng.random(len(values)) < 0.03] = np.nan
+    return pd.Series(values)
+
+
+@pytest.mark.parametrize("window, min_periods", [(20, None), (63, 40)])
+def test_volatility_and_mean_match_pandas(returns, window, min_periods):
+    rolling = returns.rolling(window, min_periods=min_periods or window)
+    np.testing.assert_allclose(rolling_volatility(returns, window, min_periods), rolling.std(), atol=1e-12)
+    np.testing.assert_allclose(rolling_mean(returns, window, min_periods), rolling.mean(), atol=1e-12)
+
+
+@pytest.mark.parametrize("window, min_periods", [(20, None), (63, 40)])
+def test_correlation_and_beta_match_pandas(returns, reference, window, min_periods):
+    min_periods = min_periods or window
+    beta, alpha = rolling_beta(returns, reference, window, min_periods)
+    for index, column in enumerate(returns.columns):
+        # pandas pairs days where both series traded, as these functions do.
+        x = returns[column].where(reference.notna())
+        y = reference.where(returns[column].notna())
+        correlation = x.rolling(window, min_periods=min_periods).corr(y)
+        expected_beta = x.rolling(window, min_periods=min_periods).cov(y) / y.rolling(window, min_periods=min_periods).var()
+        expected_alpha = x.rolling(window, min_periods=min_periods).mean() - expected_beta * y.rolling(
+            window, min_periods=min_periods
+        ).mean()
+        np.testing.assert_allclose(rolling_correlation(returns, reference, window, min_periods)[:, index],
+                                   correlation, atol=1e-9)
+        np.testing.assert_allclose(beta[:, index], expected_beta, atol=1e-9)
+        np.testing.assert_allclose(alpha[:, index], expected_alpha, atol=1e-12)
+
+
+def _drawdown_by_scan(returns, window):
+    # Deepest fall from a running peak over each window's wealth levels.
+    wealth = (1 + returns.fillna(0.0)).cumprod().to_numpy()
+    result = np.full(len(returns), np.nan)
+    for day in range(window - 1, len(returns)):
+        levels = wealth[day - window + 1:day + 1]
+        result[day] = (levels / np.maximum.accumulate(levels) - 1).min()
+    return result
+
+
+@pytest.mark.parametrize("window", [1, 5, 63])
+def test_max_drawdown_matches_scan(returns, window):
+    series = returns["BBB"]
+    np.testing.assert_allclose(rolling_max_drawdown(series, window), _drawdown_by_scan(series, window), atol=1e-12)
+
+
+def test_max_drawdown_needs_a_full_window():
+    assert np.isnan(rolling_max_drawdown([0.01, -0.02], 3)).all()
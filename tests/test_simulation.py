@@ -0,0 +1,91 @@
+import tracemalloc
+
+import numpy as np
+import pytest
+
+from Services.simulation import BlockBootstrapModel, GaussianModel, SimulationRun
+
+
+@pytest.fixture
+def gaussian():
+    return GaussianModel(mean=np.array([0.0004, 0.0002]), cov=np.array([[1e-4, 2e-5], [2e-5, 2e-4]]),
+                         weights=np.array([0.6, 0.4]))
+
+
+@pytest.fixture
+def bootstrap():
+    history = np.random.default_rng(3).normal(0.0003, 0.01, size=(500, 2))
+    return BlockBootstrapModel(history, np.array([0.5, 0.5]), block_length=21)
+
+
+def _assert_same_run(actual, expected):
+    assert actual.steps == expected.steps
+    assert actual.sizes == expected.sizes
+    np.testing.assert_allclose(actual.log_value, expected.log_value, atol=1e-12)
+    # A path right on a bin edge can land either side of it when the time
+    # chunks are summed in a different order.
+    assert np.abs(actual.counts - expected.counts).sum() <= 2 * actual.steps
+
+
+@pytest.mark.parametrize("sampling", ["standard", "antithetic"])
+def test_grown_run_matches_fresh_run(gaussian, sampling):
+    grown = SimulationRun(gaussian, seed=5, sampling=sampling).grow(126, 500).grow(252, 500).grow(252, 1200)
+    fresh = SimulationRun(gaussian, seed=5, sampling=sampling).grow(252, 1200)
+    _assert_same_run(grown, fresh)
+
+
+def test_grown_bootstrap_run_matches_fresh_run(bootstrap):
+    grown = SimulationRun(bootstrap, seed=5).grow(63, 300).grow(252, 300).grow(252, 700)
+    fresh = SimulationRun(bootstrap, seed=5).grow(252, 700)
+    _assert_same_run(grown, fresh)
+
+
+def test_bootstrap_run_grows_on_block_boundaries_only(bootstrap):
+    run = SimulationRun(bootstrap).grow(50, 100)
+    assert not run.can_grow(100, 100)
+    assert run.can_grow(50, 200)
+    assert SimulationRun(bootstrap).grow(63, 100).can_grow(100, 100)
+
+
+def test_results_do_not_depend_on_memory_budget(gaussian, bootstrap):
+    for model in (gaussian, bootstrap):
+        small = SimulationRun(model, seed=9, memory_budget_mb=0.5).grow(252, 800)
+        large = SimulationRun(model, seed=9, memory_budget_mb=256).grow(252, 800)
+        _assert_same_run(small, large)
+
+
+def test_pool_matches_serial(gaussian):
+    serial = SimulationRun(gaussian, seed=11, workers=1).grow(252, 1000)
+    pooled = SimulationRun(gaussian, seed=11, workers=2).grow(252, 1000)
+    _assert_same_run(pooled, serial)
+
+
+def test_sobol_runs_are_reproducible_and_unbiased(gaussian):
+    first = SimulationRun(gaussian, seed=2, sampling="sobol").grow(252, 2000)
+    second = SimulationRun(gaussian, seed=2, sampling="sobol").grow(252, 2000)
+    np.testing.assert_array_equal(first.log_value, second.log_value)
+    assert not first.can_grow(252, 4000)
+    # Final log values are exactly normal with the model's mean and variance.
+    assert first.log_value.mean() == pytest.approx(252 * gaussian.drift, abs=0.005)
+    assert first.log_value.std() == pytest.approx(np.sqrt(252) * gaussian.volatility, rel=0.03)
+
+
+def test_bands_track_the_final_distribution(gaussian):
+    result = SimulationRun(gaussian, seed=4).grow(252, 4000).result(100.0)
+    final = result["final_values"]
+    for percentile in (5, 50, 95):
+        assert result["bands"][percentile][-1] == pytest.approx(np.percentile(final, percentile), rel=0.01)
+    assert result["bands"][50][0] == 100.0
+    assert all(error > 0 for error in result["standard_errors"].values())
+
+
+def test_peak_memory_stays_within_budget(gaussian):
+    budget_mb = 32
+    SimulationRun(gaussian, memory_budget_mb=budget_mb).grow(10, 100)
+    tracemalloc.start()
+    try:
+        SimulationRun(gaussian, memory_budget_mb=budget_mb).grow(1000, 10000)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    assert peak <= budget_mb * 1024 * 1024 * 1.1